@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction
+from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction, PredictionJob, PredictionDailyStats
 
 
 @admin.register(UserProfile)
@@ -33,6 +33,22 @@ class TransactionAdmin(admin.ModelAdmin):
 @admin.register(CropQualityPrediction)
 class CropQualityPredictionAdmin(admin.ModelAdmin):
     list_display = ['user', 'predicted_quality', 'quality_score', 'prediction_confidence', 'created_at']
-    list_filter = ['predicted_quality', 'created_at']
+    list_filter = ['predicted_quality', 'model_version', 'created_at']
+    search_fields = ['user__username', 'content_hash']
+    readonly_fields = ['predicted_quality', 'quality_score', 'prediction_confidence', 'content_hash', 'model_version', 'created_at']
+
+
+@admin.register(PredictionJob)
+class PredictionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'content_hash']
+    readonly_fields = ['content_hash', 'claim_token', 'claimed_at', 'finished_at', 'error', 'prediction', 'created_at']
+
+
+@admin.register(PredictionDailyStats)
+class PredictionDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'day', 'total', 'good', 'bad', 'average_score']
+    list_filter = ['day']
     search_fields = ['user__username']
-    readonly_fields = ['predicted_quality', 'quality_score', 'prediction_confidence', 'created_at']
+    readonly_fields = ['user', 'day', 'total', 'good', 'bad', 'score_sum']
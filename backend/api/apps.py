@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .models import CropQualityPrediction, PredictionJob
+        from .prediction_stats import record_prediction_deleted, record_prediction_saved
+        from .storage import release_instance_files, retain_instance_files
+
+        # Content-addressed files are shared between rows; count the references
+        for model in (CropQualityPrediction, PredictionJob):
+            post_save.connect(retain_instance_files, sender=model, dispatch_uid=f"retain_{model.__name__}_files")
+            post_delete.connect(release_instance_files, sender=model, dispatch_uid=f"release_{model.__name__}_files")
+        # Per-user daily rollups, updated in the prediction's transaction
+        post_save.connect(record_prediction_saved, sender=CropQualityPrediction, dispatch_uid='record_prediction_saved')
+        post_delete.connect(record_prediction_deleted, sender=CropQualityPrediction, dispatch_uid='record_prediction_deleted')
@@ -0,0 +1,210 @@
+"""Crop quality predictions for a whole lot of photos in one request.
+
+Images come from repeated ``images`` form fields and/or ``archive`` ZIP
+uploads. ZIP entries are read one batch at a time, so the archive itself is
+never loaded into memory (Django spools large uploads to a temporary file).
+Each batch is decoded in parallel threads and scored with one model call,
+and all rows are inserted with a single ``bulk_create`` in one transaction.
+"""
+import hashlib
+import io
+import os
+import zipfile
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+import logging
+
+from .derivatives import derivatives_enabled
+from .ml_utils import MODEL_INPUT_SIZE, predictor, preprocess_batch
+from .models import CropQualityPrediction
+from .prediction_cache import hash_upload
+from .prediction_stats import record_predictions
+from .storage import retain_files
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class BulkUploadError(Exception):
+    """The request as a whole can't be processed (bad archive, too many images)"""
+
+
+def _is_image_name(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _archive_entries(zf):
+    # Image entries of an archive, skipping folders and macOS resource forks
+    for info in zf.infolist():
+        base = os.path.basename(info.filename)
+        if info.is_dir() or not base or base.startswith('.') or info.filename.startswith('__MACOSX/'):
+            continue
+        if _is_image_name(base):
+            yield info
+
+
+class BulkImageSource:
+    """Iterates (name, file object, content hash, error) over a bulk upload"""
+
+    def __init__(self, files, archives, max_images, max_image_bytes):
+        self.files = list(files)
+        self.max_image_bytes = max_image_bytes
+        self.archives = []
+        for archive in archives:
+            try:
+                self.archives.append((archive, zipfile.ZipFile(archive)))
+            except (zipfile.BadZipFile, OSError) as e:
+                raise BulkUploadError(f"{archive.name} is not a valid ZIP archive") from e
+        self.total = len(self.files) + sum(
+            sum(1 for _ in _archive_entries(zf)) for _, zf in self.archives
+        )
+        if self.total == 0:
+            raise BulkUploadError('No images provided')
+        if self.total > max_images:
+            raise BulkUploadError(f"At most {max_images} images can be uploaded at once, got {self.total}")
+
+    def __iter__(self):
+        for upload in self.files:
+            if not _is_image_name(upload.name):
+                yield upload.name, None, '', 'Unsupported file type'
+            elif upload.size > self.max_image_bytes:
+                yield upload.name, None, '', 'Image is too large'
+            else:
+                yield upload.name, upload, hash_upload(upload), None
+
+        for archive, zf in self.archives:
+            with zf:
+                for info in _archive_entries(zf):
+                    name = os.path.basename(info.filename)
+                    # Check the real size too: the header's file_size can lie
+                    if info.file_size > self.max_image_bytes:
+                        yield name, None, '', 'Image is too large'
+                        continue
+                    try:
+                        with zf.open(info) as entry:
+                            data = entry.read(self.max_image_bytes + 1)
+                    except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                        yield name, None, '', f"Could not extract image: {e}"
+                        continue
+                    if len(data) > self.max_image_bytes:
+                        yield name, None, '', 'Image is too large'
+                        continue
+                    yield name, io.BytesIO(data), hashlib.sha256(data).hexdigest(), None
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _score_chunk(chunk, out, max_workers):
+    # Returns per-item (result, error, derivative files) for one chunk of
+    # BulkImageSource items
+    ready = [i for i, (_, source, _, error) in enumerate(chunk) if error is None]
+    outcome = [(None, error, {}) for _, _, _, error in chunk]
+    if not ready:
+        return outcome
+
+    decode_errors = []
+    derivatives = [] if derivatives_enabled() else None
+    preprocess_batch(
+        [chunk[i][1] for i in ready], out=out[:len(ready)], max_workers=max_workers,
+        errors=decode_errors, derivatives=derivatives,
+    )
+    decoded = [row for row, error in enumerate(decode_errors) if error is None]
+    for row, error in enumerate(decode_errors):
+        if error is not None:
+            outcome[ready[row]] = (None, f"Could not read image: {error}", {})
+
+    if not decoded:
+        return outcome
+    if predictor.can_predict():
+        scores = predictor.predict_scores(out[decoded])
+        results = [predictor.result_from_score(score) for score in scores]
+    else:
+        results = [predictor._mock_prediction() for _ in decoded]
+    for row, result in zip(decoded, results):
+        outcome[ready[row]] = (result, None, derivatives[row] if derivatives is not None else {})
+    return outcome
+
+
+def summarize_lot(predictions, failed):
+    """Lot-level summary over the stored predictions of one bulk upload"""
+    good = sum(1 for p in predictions if p.predicted_quality == 'good')
+    count = len(predictions)
+    return {
+        'total': count + failed,
+        'predicted': count,
+        'failed': failed,
+        'good': good,
+        'bad': count - good,
+        'good_ratio': round(good / count, 4) if count else None,
+        'mean_quality_score': round(sum(p.quality_score for p in predictions) / count, 4) if count else None,
+        'mean_confidence': round(sum(p.prediction_confidence for p in predictions) / count, 4) if count else None,
+    }
+
+
+def predict_lot(user, files, archives):
+    """Predict every image of a bulk upload and store the rows in one transaction.
+
+    Returns ``(items, predictions)``: one ``(name, prediction, error)`` per
+    image in upload order, and the created CropQualityPrediction rows.
+    Raises BulkUploadError if the upload as a whole is unusable.
+    """
+    source = BulkImageSource(
+        files, archives,
+        max_images=settings.BULK_PREDICTION_MAX_IMAGES,
+        max_image_bytes=settings.BULK_PREDICTION_MAX_IMAGE_MB * 1024 * 1024,
+    )
+    batch_size = settings.BULK_PREDICTION_BATCH_SIZE
+    width, height = MODEL_INPUT_SIZE
+    out = np.empty((batch_size, height, width, 3), dtype=np.float32)
+
+    items = []
+    pending = []
+    try:
+        for chunk in _chunks(source, batch_size):
+            for (name, image, content_hash, _), (result, error, derivatives) in zip(
+                chunk, _score_chunk(chunk, out, settings.BULK_PREDICTION_THREADS)
+            ):
+                if error is not None:
+                    items.append((name, None, error))
+                    continue
+                prediction = CropQualityPrediction(
+                    user=user,
+                    predicted_quality=result['quality_label'],
+                    quality_score=result['quality_score'],
+                    prediction_confidence=result['confidence'],
+                    content_hash=content_hash,
+                    model_version=result['model_version'],
+                )
+                # Write the file now so only one batch of images is ever held in memory
+                image.seek(0)
+                prediction.image.save(name, image if hasattr(image, 'chunks') else ContentFile(image.read()), save=False)
+                for field, content in derivatives.items():
+                    getattr(prediction, field).save(content.name, content, save=False)
+                items.append((name, prediction, None))
+                pending.append(prediction)
+
+        with transaction.atomic():
+            predictions = CropQualityPrediction.objects.bulk_create(pending)
+            # bulk_create sends no post_save
+            retain_files(predictions)
+            record_predictions(predictions)
+    except Exception:
+        for prediction in pending:
+            for field in (prediction.image, prediction.thumbnail, prediction.medium):
+                if field:
+                    field.delete(save=False)
+        raise
+    return items, predictions
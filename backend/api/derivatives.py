@@ -0,0 +1,61 @@
+"""Thumbnail and medium-size renditions of uploaded crop images.
+
+Listings show the small renditions instead of multi-megabyte originals.
+They are rendered at upload time from the image already decoded for the
+model (see ml_utils.decode_with_derivatives), so no extra decode is paid.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+# (size setting, default longest edge in pixels)
+DERIVATIVES = {
+    'thumbnail': ('CROP_THUMBNAIL_SIZE', 240),
+    'medium': ('CROP_MEDIUM_SIZE', 640),
+}
+
+
+def derivatives_enabled():
+    return getattr(settings, 'CROP_DERIVATIVES_ENABLED', True)
+
+
+def derivative_sizes():
+    """Longest edge in pixels of each derivative"""
+    return {name: getattr(settings, setting, default) for name, (setting, default) in DERIVATIVES.items()}
+
+
+def largest_derivative_size():
+    return max(derivative_sizes().values())
+
+
+def derivative_format():
+    """(Pillow format, file extension); WebP when this Pillow build supports it"""
+    requested = getattr(settings, 'CROP_DERIVATIVE_FORMAT', 'WEBP').upper()
+    if requested == 'WEBP' and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def render_derivatives(image, base_name):
+    """Encode each derivative of a decoded RGB PIL image.
+
+    Returns {field name: ContentFile} named after ``base_name``, ready to be
+    assigned to the CropQualityPrediction image fields. Renditions are never
+    upscaled.
+    """
+    image_format, extension = derivative_format()
+    stem = os.path.splitext(os.path.basename(base_name or 'crop'))[0] or 'crop'
+    options = {'quality': getattr(settings, 'CROP_DERIVATIVE_QUALITY', 80)}
+    options.update({'method': 4} if image_format == 'WEBP' else {'optimize': True})
+    files = {}
+    # Largest first, so each smaller rendition is resampled from the previous one
+    for name, size in sorted(derivative_sizes().items(), key=lambda item: -item[1]):
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, **options)
+        files[name] = ContentFile(buffer.getvalue(), name=f"{stem}_{name}.{extension}")
+    return files
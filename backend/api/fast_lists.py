@@ -0,0 +1,139 @@
+"""Read-only fast path for the crop prediction listings.
+
+CropQualityPredictionSerializer builds a model instance per row (plus one
+per related user and profile), runs every field through DRF and calls
+request.build_absolute_uri for each of the four image URLs. For large pages
+that is most of the response time. With CROP_FAST_LIST_RESPONSES on, the
+listings instead:
+
+- fetch only the serialized columns with ``.values()`` (one joined query,
+  no model instances);
+- build file URLs by prefixing the storage path with the request's origin
+  and MEDIA_URL, computed once per response;
+- render with orjson when it is installed (the stdlib encoder otherwise).
+
+The JSON is the same as the serializer's; tests compare the two. Storages
+that are not on the local filesystem still go through ``storage.url()``.
+"""
+import json
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import CropQualityPrediction
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PREDICTION_COLUMNS = (
+    'id', 'image', 'thumbnail', 'medium', 'predicted_quality', 'quality_score', 'prediction_confidence',
+    'created_at', 'user_id', 'user__username', 'user__email', 'user__first_name', 'user__last_name',
+    'user__userprofile__id', 'user__userprofile__user_type', 'user__userprofile__phone_number',
+    'user__userprofile__address', 'user__userprofile__created_at', 'user__userprofile__updated_at',
+)
+
+
+def fast_lists_enabled():
+    """CROP_FAST_LIST_RESPONSES is on and DRF renders dates and files the way this module does"""
+    return (
+        getattr(settings, 'CROP_FAST_LIST_RESPONSES', False)
+        and api_settings.DATETIME_FORMAT == ISO_8601
+        and api_settings.UPLOADED_FILES_USE_URL
+    )
+
+
+def _datetime_formatter():
+    # DRF's DateTimeField: current time zone, ISO 8601, "Z" for UTC
+    zone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        if zone is not None:
+            value = timezone.make_aware(value, zone) if timezone.is_naive(value) else value.astimezone(zone)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+    return format_datetime
+
+
+def _url_builder(storage, request):
+    """name -> absolute URL, as request.build_absolute_uri(storage.url(name))"""
+    origin = request.build_absolute_uri('/')[:-1] if request is not None else ''
+
+    if isinstance(storage, FileSystemStorage):
+        base = storage.base_url if storage.base_url.endswith('/') else storage.base_url + '/'
+        if base.startswith('/') and not base.startswith('//'):
+            prefix = origin + base
+            return lambda name: prefix + filepath_to_uri(name).lstrip('/')
+
+    def build(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return build
+
+
+def prediction_rows(rows, request):
+    """Rows of queryset.values(*PREDICTION_COLUMNS) in CropQualityPredictionSerializer's output shape"""
+    storage = CropQualityPrediction._meta.get_field('image').storage
+    file_url = _url_builder(storage, request)
+    format_datetime = _datetime_formatter()
+
+    data = []
+    for row in rows:
+        image = row['image']
+        image_url = file_url(image) if image else None
+        thumbnail, medium = row['thumbnail'], row['medium']
+        data.append({
+            'id': row['id'],
+            'user': {
+                'id': row['user_id'],
+                'username': row['user__username'],
+                'email': row['user__email'],
+                'first_name': row['user__first_name'],
+                'last_name': row['user__last_name'],
+                'profile': None if row['user__userprofile__id'] is None else {
+                    'user_type': row['user__userprofile__user_type'],
+                    'phone_number': row['user__userprofile__phone_number'],
+                    'address': row['user__userprofile__address'],
+                    'created_at': format_datetime(row['user__userprofile__created_at']),
+                    'updated_at': format_datetime(row['user__userprofile__updated_at']),
+                },
+            },
+            'image': image_url,
+            'image_url': image_url,
+            # Rows stored before derivatives existed fall back to the original
+            'thumbnail_url': file_url(thumbnail) if thumbnail else image_url,
+            'medium_url': file_url(medium) if medium else image_url,
+            'predicted_quality': row['predicted_quality'],
+            'quality_score': row['quality_score'],
+            'prediction_confidence': row['prediction_confidence'],
+            'created_at': format_datetime(row['created_at']),
+        })
+    return data
+
+
+def json_response(data, status=200):
+    """Render with orjson when available; bypasses DRF's renderer negotiation"""
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    return HttpResponse(content, status=status, content_type='application/json')
+
+
+def paginated_prediction_response(queryset, paginator, request):
+    """One keyset page of predictions through the fast path"""
+    page = paginator.paginate_queryset(queryset.values(*PREDICTION_COLUMNS), request)
+    return json_response({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': prediction_rows(page, request),
+    })
@@ -0,0 +1,128 @@
+"""Query-string filters for the supply-chain and transaction listings.
+
+Each filter maps onto a leading column of one of the composite indexes on
+SupplyChainItem and Transaction, so a filtered page is an index range scan
+rather than a scan of the whole table. Invalid values raise ValidationError
+(400) instead of being ignored.
+"""
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import MAX_ID, SupplyChainItem, Transaction
+
+
+def _query_user_id(params, name, user):
+    value = params.get(name)
+    if not value:
+        return None
+    if value == 'me':
+        return user.id
+    return _query_int(params, name)
+
+
+def _query_int(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected an integer id'})
+    if abs(number) > MAX_ID:
+        raise ValidationError({name: f"Expected an id of at most {MAX_ID}"})
+    return number
+
+
+def _query_choice(params, name, choices):
+    value = params.get(name)
+    if not value:
+        return None
+    allowed = [key for key, _ in choices]
+    if value not in allowed:
+        raise ValidationError({name: f"Expected one of {', '.join(allowed)}"})
+    return value
+
+
+def _query_datetime(params, name):
+    """ISO 8601 datetime or date (midnight); naive values use the current time zone"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Expected an ISO 8601 date or datetime'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_supply_chain_items(queryset, params, user):
+    """Items the user farmed or holds, narrowed by holder, farmer, status, product and updated_at.
+
+    ``holder`` and ``farmer`` take a user id or ``me``. Staff see every item.
+    """
+    holder = _query_user_id(params, 'holder', user)
+    farmer = _query_user_id(params, 'farmer', user)
+    status = _query_choice(params, 'status', SupplyChainItem.STATUS_CHOICES)
+    product = _query_int(params, 'product')
+    updated_after = _query_datetime(params, 'updated_after')
+    updated_before = _query_datetime(params, 'updated_before')
+
+    # Pinning holder or farmer to the user already implies visibility; leaving
+    # the OR out keeps a single index usable for the common "my stock" query
+    if not user.is_staff and user.id not in (holder, farmer):
+        queryset = queryset.filter(Q(farmer_id=user.id) | Q(current_holder_id=user.id))
+    if holder is not None:
+        queryset = queryset.filter(current_holder_id=holder)
+    if farmer is not None:
+        queryset = queryset.filter(farmer_id=farmer)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    if product is not None:
+        queryset = queryset.filter(product_id=product)
+    if updated_after is not None:
+        queryset = queryset.filter(updated_at__gte=updated_after)
+    if updated_before is not None:
+        queryset = queryset.filter(updated_at__lt=updated_before)
+    return queryset
+
+
+def filter_transactions(queryset, params, user):
+    """Transactions the user sent or received, narrowed by direction, type, item, product and created_at.
+
+    ``direction`` is ``sent``, ``received`` or omitted for both.
+    """
+    direction = _query_choice(params, 'direction', [('sent', 'Sent'), ('received', 'Received')])
+    transaction_type = _query_choice(params, 'type', Transaction.TRANSACTION_TYPES)
+    item = _query_int(params, 'item')
+    product = _query_int(params, 'product')
+    created_after = _query_datetime(params, 'created_after')
+    created_before = _query_datetime(params, 'created_before')
+
+    if direction == 'sent':
+        queryset = queryset.filter(from_user_id=user.id)
+    elif direction == 'received':
+        queryset = queryset.filter(to_user_id=user.id)
+    else:
+        queryset = queryset.filter(Q(from_user_id=user.id) | Q(to_user_id=user.id))
+    if transaction_type is not None:
+        queryset = queryset.filter(transaction_type=transaction_type)
+    if item is not None:
+        queryset = queryset.filter(supply_chain_item_id=item)
+    if product is not None:
+        queryset = queryset.filter(supply_chain_item__product_id=product)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
@@ -0,0 +1,340 @@
+"""Dedicated crop quality inference processes, separate from the web workers.
+
+``python manage.py run_inference_pool`` starts an InferencePoolServer: the
+model is loaded once in the parent and worker processes are forked from it,
+so the weight arrays are shared copy-on-write by every worker instead of
+being unpickled per gunicorn worker. Web workers reach the pool over a local
+socket through InferencePoolClient (enabled by CROP_INFERENCE_POOL_ADDRESS).
+
+multiprocessing connections unpickle whatever they receive, so the authkey
+handshake is the only thing between a peer and code execution. Server and
+client refuse to start without a private CROP_INFERENCE_POOL_AUTHKEY, and
+the server only creates Unix sockets in a directory other users cannot
+write to (e.g. /run/crop-inference, not /tmp).
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener, wait
+from django.core.exceptions import ImproperlyConfigured
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InferencePoolUnavailable(Exception):
+    """The inference pool could not be reached or did not answer in time"""
+
+
+def check_authkey(authkey):
+    """The authkey as bytes; refuses a missing key or Django's committed development one"""
+    if isinstance(authkey, str):
+        authkey = authkey.encode()
+    if not authkey:
+        raise ImproperlyConfigured('CROP_INFERENCE_POOL_AUTHKEY must be set to use the inference pool')
+    if authkey.startswith(b'django-insecure-'):
+        raise ImproperlyConfigured('CROP_INFERENCE_POOL_AUTHKEY must not be the insecure development key')
+    return authkey
+
+
+def _check_socket_directory(path):
+    """Create the socket's directory if needed; refuse one that other users can write to"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o750, exist_ok=True)
+    if os.stat(directory).st_mode & 0o002:
+        raise ImproperlyConfigured(
+            f"Refusing to create the inference pool socket in world-writable {directory}; "
+            "use a private directory such as /run/crop-inference"
+        )
+
+
+def parse_address(address):
+    """'unix:/path/to.sock' or a bare path -> socket path, 'host:port' -> (host, port)"""
+    address = str(address)
+    if address.startswith('unix:'):
+        return address[len('unix:'):]
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+def _worker_main(conn, model, model_path, precision='native'):
+    from .ml_utils import load_model_file, model_scores
+    from .precision import cast_model, input_dtype
+
+    if model is None:
+        # Spawned (not forked) workers load their own copy
+        model = cast_model(load_model_file(model_path), precision)
+    dtype = input_dtype(precision)
+
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            return
+        if batch is None:
+            return
+        try:
+            conn.send((model_scores(model, batch, dtype), None))
+        except Exception as e:
+            conn.send((None, repr(e)))
+
+
+class InferencePoolServer:
+    """Accepts batches from web workers and scores them in worker processes.
+
+    Each worker process is driven by a supervisor thread over its own pipe,
+    so the server always knows which jobs a worker holds: if the worker dies
+    (OOM killer, segfault in native code) those jobs fail at once and the
+    worker is replaced, instead of the requests waiting out their timeout.
+    """
+
+    def __init__(self, model, address, authkey, workers=None, max_batch=32, start_method='fork', model_path=None,
+                 precision='native'):
+        # A forked pool expects ``model`` already converted to ``precision``
+        self.model = model
+        self.model_path = model_path
+        self.precision = precision
+        self.address = parse_address(address)
+        self.authkey = check_authkey(authkey)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.context = multiprocessing.get_context(start_method)
+        self.jobs = queue.Queue()
+        self.processes = []
+        self.listener = None
+        self._pipes = []
+        self._in_flight = {}
+        self._supervisors = []
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self._conn_ids = itertools.count()
+        self._stopped = threading.Event()
+
+    def start(self):
+        if isinstance(self.address, str):
+            _check_socket_directory(self.address)
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        # Fork every worker before any server thread exists
+        for index in range(self.workers):
+            process, pipe = self._spawn(index)
+            self.processes.append(process)
+            self._pipes.append(pipe)
+        self.listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str):
+            # Web workers run as the same user or group
+            os.chmod(self.address, 0o660)
+        for index in range(self.workers):
+            supervisor = threading.Thread(
+                target=self._supervise, args=(index,), name=f'inference-supervisor-{index}', daemon=True
+            )
+            supervisor.start()
+            self._supervisors.append(supervisor)
+        threading.Thread(target=self._accept_loop, name='inference-accept', daemon=True).start()
+        logger.info(f"Inference pool listening on {self.address} with {self.workers} workers")
+
+    def serve_forever(self):
+        self.start()
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+        for _ in self._supervisors:
+            self.jobs.put(None)
+        if self.listener is not None:
+            self.listener.close()
+        for supervisor in self._supervisors:
+            supervisor.join(timeout=5)
+        for process in self.processes:
+            process.join(timeout=5)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def _spawn(self, index):
+        # Forked workers inherit the already-loaded model (and its weight pages)
+        model = self.model if self.context.get_start_method() == 'fork' else None
+        pipe, worker_pipe = self.context.Pipe()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker_pipe, model, self.model_path, self.precision),
+            name=f'crop-inference-{index}',
+            daemon=True,
+        )
+        process.start()
+        # Only the worker holds the other end now, so its death reads as EOF
+        worker_pipe.close()
+        return process, pipe
+
+    def _respawn(self, index):
+        process = self.processes[index]
+        process.join()
+        self._pipes[index].close()
+        logger.warning(f"Inference worker {process.name} exited with code {process.exitcode}; starting a new one")
+        self.processes[index], self._pipes[index] = self._spawn(index)
+
+    def _next_batch(self):
+        job = self.jobs.get()
+        if job is None:
+            return None
+        batch = [job]
+        rows = len(job[2])
+        # Coalesce jobs from different web workers into one predict call
+        while rows < self.max_batch:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self.jobs.put(None)
+                break
+            batch.append(job)
+            rows += len(job[2])
+        return batch
+
+    def _supervise(self, index):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            if not self.processes[index].is_alive():
+                # Died while idle: replace it before handing it work
+                self._respawn(index)
+            process, pipe = self.processes[index], self._pipes[index]
+            self._in_flight[index] = batch
+            try:
+                pipe.send(np.concatenate([tensors for _, _, tensors in batch], axis=0))
+                # A killed worker never answers: its sentinel (or the pipe's EOF) wakes us instead
+                if pipe not in wait([pipe, process.sentinel]):
+                    raise EOFError
+                scores, error = pipe.recv()
+            except (EOFError, OSError):
+                process.join()
+                scores, error = None, f"Inference worker {process.name} died (exit code {process.exitcode})"
+                if not self._stopped.is_set():
+                    self._respawn(index)
+            finally:
+                del self._in_flight[index]
+            offset = 0
+            for conn_id, request_id, tensors in batch:
+                result = None if scores is None else scores[offset:offset + len(tensors)]
+                self._send_result(conn_id, request_id, result, error)
+                offset += len(tensors)
+        try:
+            self._pipes[index].send(None)
+        except (OSError, EOFError):
+            pass
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if self._stopped.is_set():
+                    return
+                continue
+            except Exception as e:
+                # Failed handshake (e.g. wrong authkey); keep serving others
+                logger.warning(f"Rejected inference pool connection: {str(e)}")
+                continue
+            conn_id = next(self._conn_ids)
+            with self._connections_lock:
+                self._connections[conn_id] = (conn, threading.Lock())
+            threading.Thread(target=self._read_requests, args=(conn_id, conn), daemon=True).start()
+
+    def _read_requests(self, conn_id, conn):
+        try:
+            while True:
+                request_id, tensors = conn.recv()
+                self.jobs.put((conn_id, request_id, tensors))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._connections_lock:
+                self._connections.pop(conn_id, None)
+            conn.close()
+
+    def _send_result(self, conn_id, request_id, scores, error):
+        with self._connections_lock:
+            entry = self._connections.get(conn_id)
+        if entry is None:
+            return
+        conn, send_lock = entry
+        try:
+            with send_lock:
+                conn.send((request_id, scores, error))
+        except (OSError, EOFError):
+            pass
+
+
+class InferencePoolClient:
+    """Thread-safe client used by web workers; one connection per process"""
+
+    def __init__(self, address, authkey, timeout=30.0):
+        self.address = parse_address(address)
+        self.authkey = check_authkey(authkey)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._pending = {}
+        self._request_ids = itertools.count()
+
+    def _connection(self):
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                except Exception as e:
+                    raise InferencePoolUnavailable(f"Cannot connect to inference pool at {self.address}: {e}") from e
+                self._conn, self._pid, self._pending = conn, os.getpid(), {}
+                threading.Thread(
+                    target=self._read_results, args=(conn, self._pending), name='inference-client', daemon=True
+                ).start()
+            return self._conn
+
+    def _read_results(self, conn, pending):
+        try:
+            while True:
+                request_id, scores, error = conn.recv()
+                future = pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if error is not None:
+                    future.set_exception(RuntimeError(f"Inference pool error: {error}"))
+                else:
+                    future.set_result(scores)
+        except (EOFError, OSError):
+            pass
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            orphaned = list(pending.values())
+            pending.clear()
+        for future in orphaned:
+            future.set_exception(InferencePoolUnavailable('Inference pool connection closed'))
+
+    def predict_scores(self, batch):
+        """Score an (N, 200, 200, 3) batch in the pool; returns N probabilities"""
+        conn = self._connection()
+        future = Future()
+        with self._lock:
+            request_id = next(self._request_ids)
+            pending = self._pending
+            pending[request_id] = future
+            try:
+                conn.send((request_id, np.ascontiguousarray(batch)))
+            except (OSError, EOFError) as e:
+                pending.pop(request_id, None)
+                self._conn = None
+                raise InferencePoolUnavailable(f"Inference pool connection lost: {e}") from e
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError as e:
+            pending.pop(request_id, None)
+            raise InferencePoolUnavailable(f"Inference pool did not answer within {self.timeout}s") from e
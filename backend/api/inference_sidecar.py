@@ -0,0 +1,275 @@
+"""Crop quality inference over HTTP, as a sidecar next to the web workers.
+
+``flask-image-upload-2/app.py`` serves InferenceSidecarApp under gunicorn
+(gthread workers keep connections alive; bind a Unix socket or a TCP port).
+It reuses the predictor, preprocessing and micro-batching of ml_utils, so
+concurrent requests from every web worker are scored in shared batches and
+the model's CPU can be scaled separately from the web tier.
+
+Endpoints:
+
+- ``POST /v1/scores``  body: an ``.npy`` float32 (N, 200, 200, 3) batch as
+  produced by ml_utils preprocessing; returns ``{"scores": [...]}``
+- ``POST /v1/predict`` body: one raw image, or multipart/form-data with any
+  number of image parts; returns one result (or error) per image
+- ``GET /v1/health``   model readiness; 503 until the model is warm
+
+Web workers use InferenceSidecarClient (enabled by CROP_INFERENCE_SIDECAR_URL),
+which keeps a small pool of keep-alive connections per process. It raises
+InferencePoolUnavailable like the pool client, so the predictor falls back to
+scoring in-process when the sidecar is down.
+"""
+import http.client
+import io
+import json
+import os
+import queue
+import socket
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit
+import numpy as np
+import logging
+
+from .inference_pool import InferencePoolUnavailable
+
+logger = logging.getLogger(__name__)
+
+NPY_CONTENT_TYPE = 'application/x-npy'
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class InferenceSidecarClient:
+    """Thread-safe sidecar client with a per-process keep-alive connection pool"""
+
+    def __init__(self, url, timeout=30.0, pool_size=8):
+        self.address = url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        if url.startswith('unix:'):
+            self._socket_path, self._host = url[len('unix:'):], None
+        else:
+            parts = urlsplit(url if '://' in url else f'http://{url}')
+            self._socket_path, self._host = None, (parts.hostname or '127.0.0.1', parts.port or 80)
+        self._lock = threading.Lock()
+        self._idle = None
+        self._pid = None
+
+    def _new_connection(self):
+        if self._socket_path is not None:
+            return _UnixHTTPConnection(self._socket_path, self.timeout)
+        return http.client.HTTPConnection(*self._host, timeout=self.timeout)
+
+    def _pool(self):
+        # Sockets must not be shared with a forked child (gunicorn preload_app)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue(maxsize=self.pool_size)
+                self._pid = os.getpid()
+            return self._idle
+
+    def _request(self, method, path, body=None, headers=None):
+        pool = self._pool()
+        try:
+            conn, reused = pool.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._new_connection(), False
+        while True:
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                # An idle keep-alive connection may have been closed by the
+                # server; retry once on a fresh one (scoring is idempotent)
+                if reused and not isinstance(e, TimeoutError):
+                    conn, reused = self._new_connection(), False
+                    continue
+                raise InferencePoolUnavailable(f"Inference sidecar at {self.address} unreachable: {e}") from e
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, data
+
+    def predict_scores(self, batch):
+        """Score an (N, 200, 200, 3) batch in the sidecar; returns N probabilities"""
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(batch, dtype=np.float32), allow_pickle=False)
+        status, data = self._request('POST', '/v1/scores', buffer.getvalue(), {'Content-Type': NPY_CONTENT_TYPE})
+        if status == 503:
+            raise InferencePoolUnavailable(f"Inference sidecar at {self.address} has no model loaded")
+        if status != 200:
+            raise RuntimeError(f"Inference sidecar error {status}: {data[:200]!r}")
+        return np.asarray(json.loads(data)['scores'], dtype=np.float32)
+
+    def model_version(self):
+        """Version of the model the sidecar serves (None if unknown or unreachable)"""
+        try:
+            status, data = self._request('GET', '/v1/health')
+        except InferencePoolUnavailable:
+            return None
+        try:
+            return json.loads(data).get('model', {}).get('model_version')
+        except ValueError:
+            return None
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_STATUS_LINES = {
+    200: '200 OK',
+    400: '400 Bad Request',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    413: '413 Payload Too Large',
+    500: '500 Internal Server Error',
+    503: '503 Service Unavailable',
+}
+
+
+class InferenceSidecarApp:
+    """WSGI application scoring crop images with a CropQualityPredictor"""
+
+    def __init__(self, predictor, max_images=256, max_body_mb=256, decode_threads=4):
+        self.predictor = predictor
+        self.max_images = max_images
+        self.max_body_bytes = max_body_mb * 1024 * 1024
+        self.decode_threads = decode_threads
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        routes = {
+            '/v1/health': ('GET', self.health),
+            '/v1/scores': ('POST', self.scores),
+            '/v1/predict': ('POST', self.predict),
+        }
+        try:
+            if path not in routes:
+                raise _HTTPError(404, 'Not found')
+            allowed, handler = routes[path]
+            if method != allowed:
+                raise _HTTPError(405, f"Use {allowed}")
+            status, payload = handler(environ)
+        except _HTTPError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            logger.exception(f"Inference sidecar error: {str(e)}")
+            status, payload = 500, {'error': 'Internal error'}
+        body = json.dumps(payload).encode()
+        start_response(_STATUS_LINES[status], [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+        ])
+        return [body]
+
+    def _read_body(self, environ):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            raise _HTTPError(400, 'Invalid Content-Length')
+        if length > self.max_body_bytes:
+            raise _HTTPError(413, 'Request body too large')
+        return environ['wsgi.input'].read(length) if length else b''
+
+    def _require_model(self):
+        # Never answer with mock scores: a 503 makes clients score locally
+        if not self.predictor.can_predict():
+            raise _HTTPError(503, 'Model not loaded')
+
+    def _score(self, batch):
+        batcher = self.predictor.batcher
+        if batcher is None:
+            return [float(score) for score in self.predictor.predict_scores(batch)]
+        # One row per submission, so rows from concurrent requests share batches
+        futures = [batcher.submit(batch[i:i + 1]) for i in range(len(batch))]
+        return [future.result(timeout=batcher.timeout) for future in futures]
+
+    def health(self, environ):
+        model = self.predictor.readiness()
+        return (200 if model['ready'] and model['state'] != 'mock' else 503), {
+            'model': model,
+            'batching': self.predictor.batcher.stats() if self.predictor.batcher is not None else None,
+        }
+
+    def scores(self, environ):
+        from .ml_utils import MODEL_INPUT_SIZE
+
+        self._require_model()
+        try:
+            batch = np.load(io.BytesIO(self._read_body(environ)), allow_pickle=False)
+        except ValueError as e:
+            raise _HTTPError(400, f"Body is not an .npy array: {e}")
+        width, height = MODEL_INPUT_SIZE
+        if batch.ndim != 4 or batch.shape[1:] != (height, width, 3) or batch.dtype.kind != 'f':
+            raise _HTTPError(400, f"Expected a float (N, {height}, {width}, 3) batch, got {batch.dtype} {batch.shape}")
+        if len(batch) > self.max_images:
+            raise _HTTPError(413, f"At most {self.max_images} images per request")
+        batch = batch.astype(np.float32, copy=False)
+        return 200, {'scores': self._score(batch), 'model_version': self.predictor.model_version}
+
+    def _images(self, environ, body):
+        content_type = environ.get('CONTENT_TYPE', '')
+        if not content_type.startswith('multipart/'):
+            return [(environ.get('HTTP_X_FILENAME', 'image'), body)]
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+        )
+        if not message.is_multipart():
+            raise _HTTPError(400, 'Malformed multipart body')
+        return [
+            (part.get_filename() or part.get_param('name', header='content-disposition') or 'image',
+             part.get_payload(decode=True) or b'')
+            for part in message.iter_parts()
+        ]
+
+    def predict(self, environ):
+        from .ml_utils import MODEL_INPUT_SIZE, preprocess_batch
+
+        self._require_model()
+        images = self._images(environ, self._read_body(environ))
+        if not images:
+            raise _HTTPError(400, 'No images provided')
+        if len(images) > self.max_images:
+            raise _HTTPError(413, f"At most {self.max_images} images per request")
+
+        width, height = MODEL_INPUT_SIZE
+        batch = np.empty((len(images), height, width, 3), dtype=np.float32)
+        errors = []
+        preprocess_batch([io.BytesIO(data) for _, data in images], out=batch,
+                         max_workers=self.decode_threads, errors=errors)
+        decoded = [i for i, error in enumerate(errors) if error is None]
+        scores = dict(zip(decoded, self._score(batch[decoded]))) if decoded else {}
+        results = []
+        for i, (name, _) in enumerate(images):
+            if i in scores:
+                results.append({'name': name, **self.predictor.result_from_score(scores[i])})
+            else:
+                results.append({'name': name, 'error': f"Could not read image: {errors[i]}"})
+        return 200, {'results': results}
@@ -0,0 +1,63 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.ml_utils import MODEL_INPUT_SIZE, decode_with_derivatives
+from api.models import CropQualityPrediction
+from api.storage import release_instance_files, retain_files
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnail/medium derivatives for stored crop images that lack them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows updated per query')
+        parser.add_argument('--force', action='store_true', help='Re-render derivatives that already exist')
+
+    def handle(self, *args, **options):
+        queryset = CropQualityPrediction.objects.exclude(image='')
+        if not options['force']:
+            queryset = queryset.filter(Q(thumbnail='') | Q(medium=''))
+        width, height = MODEL_INPUT_SIZE
+        scratch = np.empty((height, width, 3), dtype=np.float32)
+        # Rows sharing one stored image (prediction cache hits) share its derivatives
+        rendered = {}
+        pending = []
+        replaced = []
+        done = failed = 0
+        for prediction in queryset.only('id', 'image', 'thumbnail', 'medium').order_by('id').iterator(chunk_size=options['batch_size']):
+            name = prediction.image.name
+            # Set aside before rendering replaces them (only non-empty with --force)
+            previous = CropQualityPrediction(thumbnail=prediction.thumbnail.name, medium=prediction.medium.name)
+            if name not in rendered:
+                try:
+                    with prediction.image.open('rb') as f:
+                        files = decode_with_derivatives(f, scratch)
+                except Exception as e:
+                    self.stderr.write(f"Skipping prediction {prediction.id} ({name}): {e}")
+                    failed += 1
+                    continue
+                for field, content in files.items():
+                    getattr(prediction, field).save(content.name, content, save=False)
+                rendered[name] = {field: getattr(prediction, field).name for field in files}
+            else:
+                for field, stored in rendered[name].items():
+                    setattr(prediction, field, stored)
+            # The old renditions lose this row's reference
+            replaced.append(previous)
+            pending.append(prediction)
+            if len(pending) >= options['batch_size']:
+                self._update(pending, replaced)
+                done += len(pending)
+                pending, replaced = [], []
+        if pending:
+            self._update(pending, replaced)
+            done += len(pending)
+        self.stdout.write(self.style.SUCCESS(f"Rendered derivatives for {done} predictions ({failed} skipped)"))
+
+    def _update(self, pending, replaced):
+        CropQualityPrediction.objects.bulk_update(pending, ['thumbnail', 'medium'])
+        # bulk_update sends no signals; move the storage references by hand
+        retain_files(pending, fields=('thumbnail', 'medium'))
+        for old in replaced:
+            release_instance_files(CropQualityPrediction, old)
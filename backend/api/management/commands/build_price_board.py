@@ -0,0 +1,93 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ml.predict_price import compute_trend_stats, empty_weather_snapshot, estimate_price, load_dataset
+from api.price_board import ALL_STATES, normalize_key, write_price_board
+
+# Dataset shared with pool workers. Populated in the parent before the pool
+# starts so forked workers inherit it; spawned workers load it themselves.
+_dataset = None
+
+
+def _init_worker(csv_path):
+    global _dataset
+    if _dataset is None:
+        _dataset = load_dataset(csv_path)
+
+
+def _price_commodity(task):
+    """Estimate the per-kg price of one commodity in each of its states"""
+    commodity, states = task
+    df = _dataset
+    # Narrow to the commodity once; compute_trend_stats re-applies the same
+    # filter, so per-state results match a live estimate for this commodity.
+    df_commodity = df[df['commodity_name'].astype(str).str.contains(commodity, case=False, na=False, regex=False)]
+    weather = empty_weather_snapshot()
+
+    prices = {}
+    models = set()
+    for state in [None] + list(states):
+        trend = compute_trend_stats(df_commodity, commodity, state)
+        if not trend or trend.get('rows', 0) == 0:
+            continue
+        estimate = estimate_price(commodity, 1.0, state or '', weather, trend)
+        prices[normalize_key(state) if state else ALL_STATES] = estimate['price_per_kg']
+        models.add(estimate['model'])
+    return commodity, prices, models
+
+
+class Command(BaseCommand):
+    help = 'Precompute the per-kg price of every commodity x state in the dataset into a price board'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', default=settings.PRICE_DATASET_CSV, help='Path to the commodity price dataset')
+        parser.add_argument('--output', default=settings.PRICE_BOARD_PATH, help='Where to write the price board JSON')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+
+    def handle(self, *args, **options):
+        global _dataset
+        csv_path = options['csv']
+        if not os.path.exists(csv_path):
+            raise CommandError(f"Dataset not found at {csv_path}")
+
+        started = time.monotonic()
+        _dataset = load_dataset(csv_path)
+        combos = _dataset.dropna(subset=['commodity_name', 'state']).groupby('commodity_name')['state'].unique()
+        tasks = [(str(commodity), sorted({str(s) for s in states})) for commodity, states in combos.items()]
+        self.stdout.write(f"Pricing {len(tasks)} commodities across {sum(len(s) for _, s in tasks)} commodity x state pairs")
+
+        workers = max(1, options['workers'])
+        if workers == 1:
+            results = map(_price_commodity, tasks)
+            self._write_board(results, csv_path, options['output'], started)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csv_path,)) as pool:
+                results = pool.map(_price_commodity, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+                self._write_board(results, csv_path, options['output'], started)
+
+    def _write_board(self, results, csv_path, output, started):
+        prices = {}
+        models = set()
+        for commodity, commodity_prices, commodity_models in results:
+            if commodity_prices:
+                prices.setdefault(normalize_key(commodity), {}).update(commodity_prices)
+                models.update(commodity_models)
+
+        board = {
+            'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'dataset': os.path.basename(csv_path),
+            'estimator': sorted(models),
+            'currency': 'INR',
+            'unit': 'kg',
+            'prices': prices,
+        }
+        write_price_board(board, output)
+        entries = sum(len(s) for s in prices.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {entries} prices for {len(prices)} commodities to {output} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,95 @@
+import json
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ml_utils import MODEL_INPUT_SIZE, QUALITY_THRESHOLD, load_model_file, predictor, preprocess_batch
+from api.precision import PRECISIONS, parity_report
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _held_out_images(directory):
+    # (path, label) for every image below ``directory``; images inside a
+    # folder named good/ or bad/ carry that label
+    images = []
+    for root, _, files in os.walk(directory):
+        folder = os.path.basename(root).lower()
+        label = {'good': True, 'bad': False}.get(folder)
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                images.append((os.path.join(root, name), label))
+    return sorted(images)
+
+
+class Command(BaseCommand):
+    help = 'Check that lower inference precisions agree with the reference on a held-out image set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', help='Directory of held-out images (optionally in good/ and bad/ folders)')
+        parser.add_argument('--model', help='Model to check (default: the model the API serves)')
+        parser.add_argument('--precisions', default='float32,int8', help='Comma-separated precisions to check')
+        parser.add_argument('--reference', default='float64', choices=PRECISIONS)
+        parser.add_argument('--max-label-flips', type=int, default=0,
+                            help='Allowed good/bad disagreements with the reference per precision')
+        parser.add_argument('--max-score-diff', type=float, default=0.02,
+                            help='Allowed absolute quality_score difference from the reference')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        precisions = [p.strip() for p in options['precisions'].split(',') if p.strip()]
+        unknown = [p for p in precisions if p not in PRECISIONS]
+        if unknown:
+            raise CommandError(f"Unknown precision(s): {', '.join(unknown)}")
+        model_path = options['model'] or predictor.model_path
+        if not model_path or not os.path.exists(model_path):
+            raise CommandError('No trained model found; pass --model')
+        images = _held_out_images(options['images'])
+        if not images:
+            raise CommandError(f"No images found in {options['images']}")
+
+        width, height = MODEL_INPUT_SIZE
+        inputs = np.empty((len(images), height, width, 3), dtype=np.float32)
+        errors = []
+        preprocess_batch([path for path, _ in images], out=inputs, errors=errors)
+        readable = [i for i, error in enumerate(errors) if error is None]
+        if len(readable) < len(images):
+            self.stderr.write(f"Skipping {len(images) - len(readable)} unreadable images")
+        images = [images[i] for i in readable]
+        inputs = inputs[readable]
+
+        report = parity_report(
+            load_model_file(model_path), inputs, precisions,
+            reference=options['reference'],
+            threshold=QUALITY_THRESHOLD,
+            labels=[label for _, label in images],
+        )
+
+        failures = []
+        for precision, entry in report.items():
+            entry['label_flips'] = [os.path.relpath(images[i][0], options['images']) for i in entry['label_flips']]
+            if precision == options['reference']:
+                continue
+            if len(entry['label_flips']) > options['max_label_flips']:
+                failures.append(f"{precision}: {len(entry['label_flips'])} labels differ from {options['reference']}")
+            if entry['max_abs_diff'] > options['max_score_diff']:
+                failures.append(f"{precision}: quality_score differs by up to {entry['max_abs_diff']:.4f}")
+
+        if options['json']:
+            self.stdout.write(json.dumps({'images': len(images), 'threshold': QUALITY_THRESHOLD, 'precisions': report}, indent=2))
+        else:
+            self.stdout.write(f"{len(images)} images, threshold {QUALITY_THRESHOLD}, reference {options['reference']}")
+            self.stdout.write(f"{'precision':<10}{'ms/image':>10}{'max diff':>10}{'mean diff':>11}{'flips':>7}{'accuracy':>10}")
+            for precision, entry in report.items():
+                accuracy = f"{entry['accuracy']:.3f}" if 'accuracy' in entry else '-'
+                self.stdout.write(
+                    f"{precision:<10}{entry['ms_per_image']:>10}{entry['max_abs_diff']:>10.4f}"
+                    f"{entry['mean_abs_diff']:>11.5f}{len(entry['label_flips']):>7}{accuracy:>10}"
+                )
+                for name in entry['label_flips']:
+                    self.stdout.write(f"    label flipped: {name}")
+
+        if failures:
+            raise CommandError('Precision parity check failed: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All precisions match the reference within tolerance'))
@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ml_utils import load_pickled_model
+from api.model_format import DEFAULT_MIN_BYTES, export_mapped_model, is_mapped_model, load_mapped_model
+
+
+class Command(BaseCommand):
+    help = 'Export the pickled crop quality model to the memory-mapped .mmap layout'
+
+    def add_arguments(self, parser):
+        from django.conf import settings
+        default_input = os.path.join(settings.BASE_DIR, 'ml_models', 'crop_quality_model.pkl')
+        parser.add_argument('--input', default=default_input, help='Pickled model to convert')
+        parser.add_argument('--output', help='Destination directory (default: input path with .mmap)')
+        parser.add_argument('--min-bytes', type=int, default=DEFAULT_MIN_BYTES,
+                            help='Arrays smaller than this stay inline in the skeleton')
+
+    def handle(self, *args, **options):
+        source = options['input']
+        if not os.path.isfile(source):
+            raise CommandError(f"No pickled model at {source}")
+        if is_mapped_model(source):
+            raise CommandError(f"{source} is already a mapped model")
+        output = options['output'] or os.path.splitext(source)[0] + '.mmap'
+
+        model = load_pickled_model(source)
+        manifest = export_mapped_model(model, output, min_bytes=options['min_bytes'])
+        mapped_mb = manifest['mapped_bytes'] / 1e6
+        self.stdout.write(
+            f"{manifest['model_class']}: {len(manifest['arrays'])} arrays ({mapped_mb:.1f} MB) mapped, "
+            f"{manifest['inline_bytes'] / 1e6:.1f} MB left in the skeleton"
+        )
+        if not manifest['arrays']:
+            self.stdout.write(self.style.WARNING(
+                'No numpy weight arrays were found; this model keeps its weights in another form '
+                'and gains nothing from the mapped layout'
+            ))
+
+        # Check the export round-trips before anyone points workers at it
+        started = time.perf_counter()
+        load_mapped_model(output)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output} (loads in {(time.perf_counter() - started) * 1000:.1f} ms)"
+        ))
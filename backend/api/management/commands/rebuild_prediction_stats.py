@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.prediction_stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user daily crop prediction rollups from the predictions table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats(options['users'])
+        scope = f"users {', '.join(map(str, options['users']))}" if options['users'] else 'all users'
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily rollup rows for {scope}"))
@@ -0,0 +1,69 @@
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import CropQualityPrediction, PredictionJob, StoredBlob
+from api.storage import INCOMING_DIR, ContentAddressedStorage, crop_image_storage
+
+# (model, file fields) that hold references to crop image storage
+REFERENCING_FIELDS = (
+    (CropQualityPrediction, ('image', 'thumbnail', 'medium')),
+    (PredictionJob, ('image',)),
+)
+
+
+class Command(BaseCommand):
+    help = 'Recount content-addressed crop image references from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-unreferenced', action='store_true',
+                            help='Also delete stored files that no row references')
+        parser.add_argument('--grace-seconds', type=int, default=3600,
+                            help='Never delete files younger than this (uploads still being saved)')
+
+    def handle(self, *args, **options):
+        if not isinstance(crop_image_storage, ContentAddressedStorage):
+            raise CommandError('CROP_CONTENT_ADDRESSED_STORAGE is disabled')
+
+        counts = Counter()
+        for model, fields in REFERENCING_FIELDS:
+            for field in fields:
+                counts.update(name for name in model.objects.exclude(**{field: ''}).values_list(field, flat=True).iterator())
+
+        with transaction.atomic():
+            StoredBlob.objects.all().delete()
+            StoredBlob.objects.bulk_create(
+                [StoredBlob(name=name, refs=refs) for name, refs in counts.items()], batch_size=1000
+            )
+        self.stdout.write(f"{len(counts)} stored files referenced {sum(counts.values())} times")
+
+        if options['delete_unreferenced']:
+            deleted = self._delete_unreferenced(set(counts), options['grace_seconds'])
+            self.stdout.write(f"Deleted {deleted} unreferenced files")
+        self.stdout.write(self.style.SUCCESS('Storage references rebuilt'))
+
+    def _delete_unreferenced(self, referenced, grace_seconds):
+        root = crop_image_storage.location
+        cutoff = time.time() - grace_seconds
+        deleted = 0
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, 'crop_images')):
+            dirnames[:] = [d for d in dirnames if d != INCOMING_DIR]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                crop_image_storage.delete(name)
+                deleted += 1
+        # Temp files and spare copies (see api/storage.py) of saves that never
+        # reached retain(), e.g. because the row insert failed
+        incoming = os.path.join(root, INCOMING_DIR)
+        for filename in os.listdir(incoming) if os.path.isdir(incoming) else []:
+            path = os.path.join(incoming, filename)
+            if os.path.getmtime(path) <= cutoff:
+                os.unlink(path)
+                deleted += 1
+        return deleted
@@ -0,0 +1,56 @@
+import os
+import signal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from api.inference_pool import InferencePoolServer, check_authkey
+from api.ml_utils import load_model_file, predictor
+from api.precision import cast_model
+
+
+class Command(BaseCommand):
+    help = 'Run the dedicated crop quality inference worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=settings.CROP_INFERENCE_POOL_ADDRESS or 'unix:/run/crop-inference/pool.sock',
+                            help="Socket to listen on: 'unix:/path/to.sock' or 'host:port'")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of inference processes')
+        parser.add_argument('--max-batch', type=int, default=32, help='Largest batch a worker scores in one call')
+        parser.add_argument('--start-method', choices=['fork', 'spawn'], default='fork',
+                            help='fork shares the weights loaded here with every worker; spawn loads one copy per worker '
+                                 '(still shared when the model is a mapped .mmap export)')
+
+    def handle(self, *args, **options):
+        try:
+            authkey = check_authkey(settings.CROP_INFERENCE_POOL_AUTHKEY)
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        model_path = predictor.model_path
+        if not model_path:
+            raise CommandError('No trained model found; see ml_models/README.md')
+
+        model = None
+        if options['start_method'] == 'fork':
+            model = cast_model(load_model_file(model_path), predictor.precision)
+            self.stdout.write(f"Loaded model from {model_path} ({predictor.precision} precision)")
+
+        server = InferencePoolServer(
+            model,
+            options['address'],
+            authkey=authkey,
+            workers=options['workers'],
+            max_batch=options['max_batch'],
+            start_method=options['start_method'],
+            model_path=model_path,
+            precision=predictor.precision,
+        )
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+        self.stdout.write(self.style.SUCCESS(
+            f"Inference pool on {options['address']} with {server.workers} workers"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.ml_utils import predictor
+from api.prediction_jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Process queued crop quality prediction jobs in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PREDICTION_JOB_BATCH_SIZE,
+                            help='Most jobs claimed and scored together')
+        parser.add_argument('--poll-interval', type=float, default=settings.PREDICTION_JOB_POLL_INTERVAL,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        # Pay the model load and warm-up before claiming the first batch
+        predictor.ensure_loaded()
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        self.stdout.write(self.style.SUCCESS(
+            f"Prediction worker started (batch size {options['batch_size']})"
+        ))
+        try:
+            processed = run_worker(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                stop=stop,
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f"Processed {processed} jobs")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_cropqualityprediction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cropqualityprediction',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the uploaded image bytes', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cropqualityprediction',
+            name='model_version',
+            field=models.CharField(blank=True, default='', help_text='Version of the model that made the prediction', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='cropqualityprediction',
+            index=models.Index(fields=['content_hash', 'model_version'], name='api_crop_hash_version_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_predictionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cropqualityprediction',
+            name='medium',
+            field=models.ImageField(blank=True, help_text='Medium rendition for detail views', upload_to='crop_images/derivatives/'),
+        ),
+        migrations.AddField(
+            model_name='cropqualityprediction',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Small rendition for listings', upload_to='crop_images/derivatives/'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:13
+
+import api.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_cropqualityprediction_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cropqualityprediction',
+            name='image',
+            field=models.ImageField(help_text='Upload an image of the crop for quality prediction', max_length=255, storage=api.storage.get_crop_image_storage, upload_to='crop_images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='cropqualityprediction',
+            name='medium',
+            field=models.ImageField(blank=True, help_text='Medium rendition for detail views', max_length=255, storage=api.storage.get_crop_image_storage, upload_to='crop_images/derivatives/'),
+        ),
+        migrations.AlterField(
+            model_name='cropqualityprediction',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Small rendition for listings', max_length=255, storage=api.storage.get_crop_image_storage, upload_to='crop_images/derivatives/'),
+        ),
+        migrations.AlterField(
+            model_name='predictionjob',
+            name='image',
+            field=models.ImageField(max_length=255, storage=api.storage.get_crop_image_storage, upload_to='crop_images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_content_addressed_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='cropqualityprediction',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='cropqualityprediction',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='api_crop_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_prediction_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplychainitem',
+            index=models.Index(fields=['current_holder', 'status', 'updated_at', 'id'], name='api_item_holder_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplychainitem',
+            index=models.Index(fields=['farmer', 'updated_at', 'id'], name='api_item_farmer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplychainitem',
+            index=models.Index(fields=['product', 'updated_at', 'id'], name='api_item_product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['from_user', 'created_at', 'id'], name='api_tx_from_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['to_user', 'created_at', 'id'], name='api_tx_to_created_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    # Same aggregation as api.prediction_stats.rebuild_daily_stats, on the
+    # historical models
+    CropQualityPrediction = apps.get_model('api', 'CropQualityPrediction')
+    PredictionDailyStats = apps.get_model('api', 'PredictionDailyStats')
+    aggregates = (
+        CropQualityPrediction.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(
+            total=Count('id'),
+            good=Count('id', filter=Q(predicted_quality='good')),
+            bad=Count('id', filter=Q(predicted_quality='bad')),
+            score_sum=Sum('quality_score'),
+        )
+    )
+    PredictionDailyStats.objects.bulk_create(
+        [PredictionDailyStats(**row) for row in aggregates.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_supply_chain_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('good', models.IntegerField(default=0)),
+                ('bad', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0, help_text='Sum of quality_score, for the average')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='api_prediction_stats_user_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_prediction_daily_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['supply_chain_item', 'from_user', 'created_at', 'id'], name='api_tx_item_from_created_idx'),
+        ),
+    ]
@@ -1,141 +1,455 @@
 import os
 import pickle
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from PIL import Image
 from django.conf import settings
 import logging
 
+from .derivatives import largest_derivative_size, render_derivatives
+from .inference_pool import InferencePoolClient, InferencePoolUnavailable
+from .inference_sidecar import InferenceSidecarClient
+from .model_format import is_mapped_model, load_mapped_model, mapped_model_version
+from .precision import PRECISIONS, cast_model, input_dtype
+from .timing import pipeline_metrics, stage
+
 logger = logging.getLogger(__name__)
 
-class CropQualityPredictor:
-    """Crop quality prediction using trained ML model"""
-    
-    def __init__(self):
-        self.model = None
-        self.model_path = self._get_model_path()
-        self.load_model()
-    
-    def _get_model_path(self):
-        """Get the path to the trained model"""
-        # Try to find the model in common locations
-        possible_paths = [
-            os.path.join(settings.BASE_DIR, 'ml_models', 'crop_quality_model.pkl'),
-            os.path.join(settings.BASE_DIR, 'models', 'crop_quality_model.pkl'),
-            os.path.join(settings.BASE_DIR, 'crop_quality_model.pkl'),
-            # Fallback to the original path from Flask app
-            r'C:\Users\HARIHARAN K\Desktop\Crop-Quality-prediction-System-Using-CNN\source_code\crop_quality_model.pkl'
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                return path
-        
-        # If no model found, return None
-        logger.warning("No trained model found. Please place crop_quality_model.pkl in the models directory.")
-        return None
-    
-    def load_model(self):
-        """Load the trained model"""
-        if self.model_path and os.path.exists(self.model_path):
-            try:
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                logger.info(f"Model loaded successfully from {self.model_path}")
-            except Exception as e:
-                logger.error(f"Error loading model: {str(e)}")
-                self.model = None
-        else:
-            logger.warning("Model file not found. Using mock predictions.")
-            self.model = None
-    
-    def preprocess_image(self, image_path):
-        """Preprocess image for model prediction"""
+# Decision threshold on the model's "good" probability
+QUALITY_THRESHOLD = 0.4
+
+# model_version recorded for predictions made without a real model
+MOCK_MODEL_VERSION = 'mock'
+
+# Model input size (width, height)
+MODEL_INPUT_SIZE = (200, 200)
+
+_thread_buffers = threading.local()
+
+
+def load_pickled_model(model_path):
+    """Unpickle a trained model from disk"""
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_model_file(model_path):
+    """Load a model from a mapped model directory (preferred) or a pickle"""
+    if is_mapped_model(model_path):
+        return load_mapped_model(model_path)
+    return load_pickled_model(model_path)
+
+
+def model_file_version(model_path):
+    """Short content hash identifying a model file"""
+    if is_mapped_model(model_path):
+        return mapped_model_version(model_path)
+    import hashlib
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()[:16]}"
+
+
+def model_scores(model, batch, dtype=None):
+    """Run a model over an (N, 200, 200, 3) batch and return N "good" probabilities"""
+    if dtype is not None and batch.dtype != dtype:
+        batch = batch.astype(dtype)
+    prediction = np.asarray(model.predict(batch))
+    return prediction.reshape(len(batch), -1)[:, 0]
+
+
+def decode_image(source, size=MODEL_INPUT_SIZE):
+    """Open an image file/path and decode it as RGB at reduced scale.
+
+    For JPEGs, draft mode makes libjpeg decode straight at 1/2, 1/4 or 1/8
+    scale while staying at least ``size``, so a 12 MP photo never expands to
+    full resolution. Pillow releases the GIL while decoding and resizing.
+    """
+    with stage('decode'):
+        image = Image.open(source)
+        image.draft('RGB', size)
+        return image.convert('RGB')
+
+
+def preprocess_into(source, out):
+    """Decode, resize and scale one image to [0, 1] directly into ``out``.
+
+    ``out`` is a float32 (200, 200, 3) array, typically a row of a reusable
+    batch buffer, so no float64 intermediate is ever allocated.
+    """
+    image = decode_image(source)
+    with stage('resize'):
+        np.divide(np.asarray(image.resize(MODEL_INPUT_SIZE)), np.float32(255.0), out=out)
+    return out
+
+
+def decode_with_derivatives(source, out):
+    """Like preprocess_into, but also render the thumbnail/medium derivatives.
+
+    The image is decoded once, at the largest derivative size, and both the
+    model input and the derivatives are resized from it. Returns the
+    derivative files from derivatives.render_derivatives.
+    """
+    size = largest_derivative_size()
+    image = decode_image(source, size=(size, size))
+    with stage('resize'):
+        np.divide(np.asarray(image.resize(MODEL_INPUT_SIZE)), np.float32(255.0), out=out)
+    name = source if isinstance(source, str) else getattr(source, 'name', '')
+    with stage('derivatives'):
+        return render_derivatives(image, name)
+
+
+def tile_positions(length, tile, stride):
+    """Start offsets of tiles covering [0, length), the last one flush with the end"""
+    if length <= tile:
+        return np.zeros(1, dtype=np.intp)
+    return np.append(np.arange(0, length - tile, stride), length - tile)
+
+
+def tile_batch(pixels, tile=MODEL_INPUT_SIZE[0], stride=150, out=None):
+    """Cut an (H, W, 3) uint8 image into overlapping tile x tile model inputs.
+
+    The windows are strided views of ``pixels`` (sliding_window_view), so no
+    tile is copied on its own: the selected windows are gathered with a single
+    fancy index and scaled to [0, 1] into one float32 (rows * cols, tile,
+    tile, 3) batch. Returns ``(batch, (rows, cols), (ys, xs))`` where ys/xs
+    are the tiles' top/left offsets.
+    """
+    height, width = pixels.shape[:2]
+    if height < tile or width < tile:
+        raise ValueError(f"Image is {width}x{height}, smaller than one {tile}x{tile} tile")
+    ys = tile_positions(height, tile, stride)
+    xs = tile_positions(width, tile, stride)
+    windows = np.lib.stride_tricks.sliding_window_view(pixels, (tile, tile, 3))
+    if out is None:
+        out = np.empty((len(ys) * len(xs), tile, tile, 3), dtype=np.float32)
+    np.divide(
+        windows[ys[:, None], xs[None, :], 0],
+        np.float32(255.0),
+        out=out.reshape(len(ys), len(xs), tile, tile, 3),
+    )
+    return out, (len(ys), len(xs)), (ys, xs)
+
+
+def fit_for_tiles(image, max_edge, tile=MODEL_INPUT_SIZE[0]):
+    """Scale a PIL image so its longest edge is at most ``max_edge`` and its shortest at least one tile"""
+    width, height = image.size
+    scale = min(1.0, max_edge / max(width, height))
+    scale = max(scale, tile / min(width, height))
+    if scale == 1.0:
+        return image
+    size = (max(tile, round(width * scale)), max(tile, round(height * scale)))
+    return image.resize(size, Image.Resampling.BILINEAR)
+
+
+def preprocess_batch(sources, out=None, max_workers=4, errors=None, derivatives=None):
+    """Preprocess several images in parallel threads into one float32 batch.
+
+    Pass a preallocated ``out`` of shape (N, 200, 200, 3) to reuse it. When
+    an ``errors`` list is given, an image that fails to decode doesn't abort
+    the batch: ``errors[i]`` is set to the exception (None for the rest).
+    When a ``derivatives`` list is given, ``derivatives[i]`` receives the
+    image's rendered derivatives (see decode_with_derivatives).
+    """
+    width, height = MODEL_INPUT_SIZE
+    if out is None:
+        out = np.empty((len(sources), height, width, 3), dtype=np.float32)
+    if errors is not None:
+        errors[:] = [None] * len(sources)
+    if derivatives is not None:
+        derivatives[:] = [None] * len(sources)
+
+    def load(i):
         try:
-            # Open and convert image to RGB
-            image = Image.open(image_path).convert('RGB')
-            
-            # Resize to match model input (200x200)
-            image = image.resize((200, 200))
-            
-            # Convert to numpy array and normalize
-            image_array = np.array(image) / 255.0
-            
-            # Add batch dimension
-            image_array = np.expand_dims(image_array, axis=0)
-            
-            return image_array
+            if derivatives is not None:
+                derivatives[i] = decode_with_derivatives(sources[i], out[i])
+            else:
+                preprocess_into(sources[i], out[i])
         except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
-            raise
-    
-    def predict_quality(self, image_path):
-        """Predict crop quality from image"""
-        try:
-            if self.model is None:
-                # Return mock prediction if model is not available
-                return self._mock_prediction()
-            
-            # Preprocess the image
-            processed_image = self.preprocess_image(image_path)
-            
-            # Make prediction
-            prediction = self.model.predict(processed_image)
-            
-            # Extract quality score (assuming model outputs probability for "Good")
-            quality_score = float(prediction[0][0])
-            
-            # Determine quality label based on threshold
-            quality_label = "good" if quality_score > 0.4 else "bad"
-            
-            # Calculate confidence (distance from threshold)
-            confidence = abs(quality_score - 0.4) * 2.5  # Scale to 0-1
-            confidence = min(confidence, 1.0)
-            
+            if errors is None:
+                raise
+            errors[i] = e
+
+    if max_workers <= 1 or len(sources) <= 1:
+        for i in range(len(sources)):
+            load(i)
+        return out
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as pool:
+        list(pool.map(load, range(len(sources))))
+    return out
+
+
+def _thread_input_buffer():
+    # The calling thread blocks until its prediction is done, so one
+    # (1, 200, 200, 3) buffer per thread can be reused for every request.
+    buffer = getattr(_thread_buffers, 'single', None)
+    if buffer is None:
+        width, height = MODEL_INPUT_SIZE
+        buffer = _thread_buffers.single = np.empty((1, height, width, 3), dtype=np.float32)
+    return buffer
+
+
+class BatchingScheduler:
+    """Coalesces concurrent single-image predictions into batched model calls.
+
+    Callers submit preprocessed (1, H, W, C) tensors and get a Future for the
+    score. A worker thread collects up to ``max_batch`` tensors, waiting at most
+    ``max_wait_ms`` after the first one arrives, runs a single ``predict_fn``
+    over the stacked batch and resolves each caller's Future. predict() waits
+    at most ``timeout`` seconds for it.
+    """
+
+    def __init__(self, predict_fn, max_batch=16, max_wait_ms=5.0, history=1024, timeout=60.0):
+        self.predict_fn = predict_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self._batch_sizes = {}
+        self._queue_waits_ms = deque(maxlen=history)
+        self._batches = 0
+        self._items = 0
+        self._predict_ms_total = 0.0
+        self._buffer = None
+
+    def _ensure_worker(self):
+        # Start lazily, and again after a fork (gunicorn preload_app), since
+        # threads don't survive into the child process.
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                thread = threading.Thread(target=self._run, args=(self._queue,), name='crop-quality-batcher', daemon=True)
+                thread.start()
+                self._pid = os.getpid()
+        return self._queue
+
+    def submit(self, tensor):
+        """Enqueue one preprocessed tensor; returns a Future resolving to its score"""
+        future = Future()
+        self._ensure_worker().put((tensor, future, time.monotonic()))
+        return future
+
+    def predict(self, tensor):
+        """Blocking convenience wrapper around submit(); raises TimeoutError after ``timeout`` seconds"""
+        return self.submit(tensor).result(timeout=self.timeout)
+
+    def _collect(self, work_queue):
+        first = work_queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(work_queue.get(timeout=remaining) if remaining > 0 else work_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, work_queue):
+        while True:
+            batch = self._collect(work_queue)
+            started = time.monotonic()
+            try:
+                scores = self.predict_fn(self._stack([tensor for tensor, _, _ in batch]))
+                if len(scores) != len(batch):
+                    raise RuntimeError(f"Model returned {len(scores)} scores for a batch of {len(batch)}")
+                scores = [float(score) for score in scores]
+            except Exception as e:
+                # Every caller gets an answer, or its thread would wait forever
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self._record(batch, started)
+            for (_, future, _), score in zip(batch, scores):
+                future.set_result(score)
+
+    def _stack(self, tensors):
+        # Copy into a batch buffer owned by the worker thread instead of
+        # allocating a new array per batch
+        rows = sum(len(t) for t in tensors)
+        sample = tensors[0]
+        if self._buffer is None or self._buffer.shape[1:] != sample.shape[1:] or self._buffer.dtype != sample.dtype \
+                or len(self._buffer) < rows:
+            self._buffer = np.empty((max(rows, self.max_batch),) + sample.shape[1:], dtype=sample.dtype)
+        return np.concatenate(tensors, axis=0, out=self._buffer[:rows])
+
+    def _record(self, batch, started):
+        now = time.monotonic()
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._predict_ms_total += (now - started) * 1000.0
+            self._queue_waits_ms.extend((started - enqueued) * 1000.0 for _, _, enqueued in batch)
+
+    def stats(self):
+        """Batch-size and queue-wait metrics for this process"""
+        with self._lock:
+            waits = sorted(self._queue_waits_ms)
+            batches = self._batches
+
+            def percentile(p):
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else None
+
             return {
-                'quality_label': quality_label,
-                'quality_score': quality_score,
-                'confidence': confidence
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': batches,
+                'items': self._items,
+                'mean_batch_size': round(self._items / batches, 3) if batches else None,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'mean_predict_ms': round(self._predict_ms_total / batches, 3) if batches else None,
+                'queue_wait_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
             }
-            
-        except Exception as e:
-            logger.error(f"Error making prediction: {str(e)}")
-            return self._mock_prediction()
-    
-    def _mock_prediction(self):
-        """Return mock prediction when model is not available"""
-        import random
-        quality_score = random.uniform(0.3, 0.8)
-        quality_label = "good" if quality_score > 0.4 else "bad"
-        confidence = random.uniform(0.6, 0.9)
-        
-        return {
-            'quality_label': quality_label,
-            'quality_score': quality_score,
-            'confidence': confidence
-        }
 
-# Global instance
-predictor = CropQualityPredictor()
-import pickle
-import numpy as np
-from PIL import Image
-from django.conf import settings
-import logging
-
-logger = logging.getLogger(__name__)
 
 class CropQualityPredictor:
     """Crop quality prediction using trained ML model"""
     
     def __init__(self):
+        # Nothing is loaded here: importing this module (migrations, admin,
+        # management commands) must not unpickle the model. It is loaded by
+        # ensure_loaded() on first use, or at server boot (CROP_MODEL_PRELOAD).
         self.model = None
         self.model_path = self._get_model_path()
-        self.load_model()
+        self.precision = getattr(settings, 'CROP_INFERENCE_PRECISION', 'native')
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"CROP_INFERENCE_PRECISION must be one of {', '.join(PRECISIONS)}, got {self.precision!r}")
+        self._model_version = None
+        self._load_lock = threading.Lock()
+        self._load_attempted = False
+        self._loading = False
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.warm = False
+        self.pool_client = None
+        sidecar_url = getattr(settings, 'CROP_INFERENCE_SIDECAR_URL', '')
+        pool_address = getattr(settings, 'CROP_INFERENCE_POOL_ADDRESS', '')
+        if sidecar_url:
+            # Same contract as the pool client, over keep-alive HTTP
+            self.pool_client = InferenceSidecarClient(
+                sidecar_url,
+                timeout=getattr(settings, 'CROP_INFERENCE_SIDECAR_TIMEOUT', 30),
+                pool_size=getattr(settings, 'CROP_INFERENCE_SIDECAR_CONNECTIONS', 8),
+            )
+        elif pool_address:
+            # The dedicated inference pool holds the model; this process
+            # only loads it if the pool turns out to be unreachable.
+            self.pool_client = InferencePoolClient(
+                pool_address,
+                authkey=settings.CROP_INFERENCE_POOL_AUTHKEY.encode(),
+                timeout=getattr(settings, 'CROP_INFERENCE_POOL_TIMEOUT', 30),
+            )
+        self.batcher = None
+        if getattr(settings, 'CROP_BATCHING_ENABLED', True):
+            self.batcher = BatchingScheduler(
+                self.predict_scores,
+                max_batch=getattr(settings, 'CROP_BATCH_MAX_SIZE', 16),
+                max_wait_ms=getattr(settings, 'CROP_BATCH_MAX_WAIT_MS', 5),
+                timeout=getattr(settings, 'CROP_BATCH_TIMEOUT', 60),
+            )
+
+    @property
+    def model_version(self):
+        """Version tag of the model in use (loads it on first access)"""
+        self.ensure_loaded()
+        return self._model_version
+
+    @model_version.setter
+    def model_version(self, value):
+        self._model_version = value
+
+    def ensure_loaded(self, warm_up=True):
+        """Load the model (or connect to the pool) once, then run a warm-up batch.
+
+        Thread-safe; concurrent first requests wait for a single load.
+        """
+        if self._load_attempted or self.model is not None:
+            return
+        with self._load_lock:
+            if self._load_attempted or self.model is not None:
+                return
+            self._loading = True
+            try:
+                started = time.perf_counter()
+                if self.pool_client is not None:
+                    self._model_version = self._get_model_version()
+                    if self._model_version is None and hasattr(self.pool_client, 'model_version'):
+                        # The sidecar may run on a host without a local model file
+                        self._model_version = self.pool_client.model_version()
+                else:
+                    self.load_model()
+                self.load_seconds = time.perf_counter() - started
+                if warm_up and (self.model is not None or self.pool_client is not None):
+                    self.warm_up()
+            finally:
+                self._load_attempted = True
+                self._loading = False
+
+    def start_loading(self):
+        """Begin ensure_loaded() in a background thread if nothing has started it yet"""
+        if self._load_attempted or self._loading or self.model is not None:
+            return
+        threading.Thread(target=self.ensure_loaded, name='crop-model-load', daemon=True).start()
+
+    def warm_up(self, batch_size=None):
+        """Score a batch of dummy input so lazy framework setup happens before real traffic"""
+        if batch_size is None:
+            batch_size = getattr(settings, 'CROP_WARMUP_BATCH_SIZE', 1)
+        if batch_size <= 0:
+            self.warm = True
+            return
+        width, height = MODEL_INPUT_SIZE
+        dummy = np.full((batch_size, height, width, 3), 0.5, dtype=np.float32)
+        started = time.perf_counter()
+        try:
+            self.predict_scores(dummy)
+            self.warm = True
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {str(e)}")
+        self.warmup_seconds = time.perf_counter() - started
+
+    def readiness(self):
+        """Model state for health checks; ``ready`` once a request can be served without loading"""
+        if self._loading or not (self._load_attempted or self.model is not None):
+            state = 'loading' if self._loading else 'not_loaded'
+        elif self.pool_client is not None:
+            state = 'pool'
+        elif self.model is not None:
+            state = 'loaded'
+        else:
+            state = 'mock'
+        return {
+            'state': state,
+            'ready': state == 'mock' or (state in ('loaded', 'pool') and self.warm),
+            'warm': self.warm,
+            'model_path': self.model_path,
+            'precision': self.precision,
+            'model_version': self._model_version or (MOCK_MODEL_VERSION if state == 'mock' else None),
+            'load_seconds': round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            'warmup_seconds': round(self.warmup_seconds, 4) if self.warmup_seconds is not None else None,
+            'error': self.load_error,
+        }
     
     def _get_model_path(self):
         """Get the path to the trained model"""
         # Try to find the model in common locations
+        # Memory-mapped exports (`python manage.py convert_crop_model`) win over pickles
         possible_paths = [
+            os.path.join(settings.BASE_DIR, 'ml_models', 'crop_quality_model.mmap'),
+            os.path.join(settings.BASE_DIR, 'models', 'crop_quality_model.mmap'),
             os.path.join(settings.BASE_DIR, 'ml_models', 'crop_quality_model.pkl'),
             os.path.join(settings.BASE_DIR, 'models', 'crop_quality_model.pkl'),
             os.path.join(settings.BASE_DIR, 'crop_quality_model.pkl'),
@@ -148,23 +462,35 @@ class CropQualityPredictor:
                 return path
         
         # If no model found, return None
-        logger.warning("No trained model found. Please place crop_quality_model.pkl in the models directory.")
+        logger.warning("No trained model found. Please place crop_quality_model.pkl (or its .mmap export) in the models directory.")
         return None
     
     def load_model(self):
         """Load the trained model"""
         if self.model_path and os.path.exists(self.model_path):
             try:
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
+                self.model = cast_model(load_model_file(self.model_path), self.precision)
+                self._model_version = self._get_model_version()
+                self.load_error = None
                 logger.info(f"Model loaded successfully from {self.model_path}")
             except Exception as e:
                 logger.error(f"Error loading model: {str(e)}")
+                self.load_error = str(e)
                 self.model = None
         else:
             logger.warning("Model file not found. Using mock predictions.")
             self.model = None
     
+    def _get_model_version(self):
+        """Version tag stored with predictions; keys the prediction cache"""
+        version = getattr(settings, 'CROP_MODEL_VERSION', '')
+        if not version and self.model_path and os.path.exists(self.model_path):
+            version = model_file_version(self.model_path)
+        if version and self.precision != 'native':
+            # Scores differ slightly between precisions; never share cached results
+            version = f"{version}+{self.precision}"
+        return version or None
+
     def preprocess_image(self, image_path):
         """Preprocess image for model prediction"""
         try:
@@ -184,172 +510,188 @@ class CropQualityPredictor:
         except Exception as e:
             logger.error(f"Error preprocessing image: {str(e)}")
             raise
-    
-    def predict_quality(self, image_path):
-        """Predict crop quality from image"""
+
+    def preprocess_image_fast(self, image_source, out=None):
+        """Fast equivalent of preprocess_image used for inference.
+
+        Decodes JPEGs in draft mode and writes float32 values straight into
+        ``out`` (default: this thread's reusable (1, 200, 200, 3) buffer).
+        ``image_source`` may be a path or a file object such as an uploaded
+        file; file objects are rewound afterwards so they can still be saved.
+        """
         try:
-            if self.model is None:
-                # Return mock prediction if model is not available
-                return self._mock_prediction()
-            
-            # Preprocess the image
-            processed_image = self.preprocess_image(image_path)
-            
-            # Make prediction
-            prediction = self.model.predict(processed_image)
-            
-            # Extract quality score (assuming model outputs probability for "Good")
-            quality_score = float(prediction[0][0])
-            
-            # Determine quality label based on threshold
-            quality_label = "good" if quality_score > 0.4 else "bad"
-            
-            # Calculate confidence (distance from threshold)
-            confidence = abs(quality_score - 0.4) * 2.5  # Scale to 0-1
-            confidence = min(confidence, 1.0)
-            
-            return {
-                'quality_label': quality_label,
-                'quality_score': quality_score,
-                'confidence': confidence
-            }
-            
+            out = _thread_input_buffer() if out is None else out
+            preprocess_into(image_source, out[0])
+            return out
         except Exception as e:
-            logger.error(f"Error making prediction: {str(e)}")
-            return self._mock_prediction()
+            logger.error(f"Error preprocessing image: {str(e)}")
+            raise
+        finally:
+            if hasattr(image_source, 'seek'):
+                image_source.seek(0)
     
-    def _mock_prediction(self):
-        """Return mock prediction when model is not available"""
-        import random
-        quality_score = random.uniform(0.3, 0.8)
-        quality_label = "good" if quality_score > 0.4 else "bad"
-        confidence = random.uniform(0.6, 0.9)
-        
+    def can_predict(self):
+        """Whether a real model (local or in the inference pool) is available"""
+        self.ensure_loaded()
+        return self.model is not None or self.pool_client is not None
+
+    def predict_scores(self, batch):
+        """Run the model over an (N, 200, 200, 3) batch and return N "good" probabilities"""
+        if self.pool_client is not None:
+            try:
+                return self.pool_client.predict_scores(batch)
+            except InferencePoolUnavailable as e:
+                logger.warning(f"Inference pool unavailable, predicting in-process: {str(e)}")
+                if self.model is None:
+                    self.load_model()
+                if self.model is None:
+                    raise
+        return model_scores(self.model, batch, input_dtype(self.precision))
+
+    def result_from_score(self, quality_score):
+        """Turn a model score into the label/score/confidence result dict"""
+        quality_score = float(quality_score)
+
+        # Determine quality label based on threshold
+        quality_label = "good" if quality_score > QUALITY_THRESHOLD else "bad"
+
+        # Calculate confidence (distance from threshold)
+        confidence = abs(quality_score - QUALITY_THRESHOLD) * 2.5  # Scale to 0-1
+        confidence = min(confidence, 1.0)
+
         return {
             'quality_label': quality_label,
             'quality_score': quality_score,
-            'confidence': confidence
+            'confidence': confidence,
+            'model_version': self._model_version or '',
         }
 
-# Global instance
-predictor = CropQualityPredictor()
-import pickle
-import numpy as np
-from PIL import Image
-from django.conf import settings
-import logging
+    def predict_quality(self, image_path, derivatives=None):
+        """Predict crop quality from an image path or file object.
 
-logger = logging.getLogger(__name__)
-
-class CropQualityPredictor:
-    """Crop quality prediction using trained ML model"""
-    
-    def __init__(self):
-        self.model = None
-        self.model_path = self._get_model_path()
-        self.load_model()
-    
-    def _get_model_path(self):
-        """Get the path to the trained model"""
-        # Try to find the model in common locations
-        possible_paths = [
-            os.path.join(settings.BASE_DIR, 'ml_models', 'crop_quality_model.pkl'),
-            os.path.join(settings.BASE_DIR, 'models', 'crop_quality_model.pkl'),
-            os.path.join(settings.BASE_DIR, 'crop_quality_model.pkl'),
-            # Fallback to the original path from Flask app
-            r'C:\Users\HARIHARAN K\Desktop\Crop-Quality-prediction-System-Using-CNN\source_code\crop_quality_model.pkl'
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                return path
-        
-        # If no model found, return None
-        logger.warning("No trained model found. Please place crop_quality_model.pkl in the models directory.")
-        return None
-    
-    def load_model(self):
-        """Load the trained model"""
-        if self.model_path and os.path.exists(self.model_path):
-            try:
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                logger.info(f"Model loaded successfully from {self.model_path}")
-            except Exception as e:
-                logger.error(f"Error loading model: {str(e)}")
-                self.model = None
-        else:
-            logger.warning("Model file not found. Using mock predictions.")
-            self.model = None
-    
-    def preprocess_image(self, image_path):
-        """Preprocess image for model prediction"""
-        try:
-            # Open and convert image to RGB
-            image = Image.open(image_path).convert('RGB')
-            
-            # Resize to match model input (200x200)
-            image = image.resize((200, 200))
-            
-            # Convert to numpy array and normalize
-            image_array = np.array(image) / 255.0
-            
-            # Add batch dimension
-            image_array = np.expand_dims(image_array, axis=0)
-            
-            return image_array
-        except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
-            raise
-    
-    def predict_quality(self, image_path):
-        """Predict crop quality from image"""
+        Pass a dict as ``derivatives`` to also receive the image's thumbnail
+        and medium renditions, rendered from the same decode.
+        """
         try:
-            if self.model is None:
+            processed_image = None
+            if derivatives is not None:
+                processed_image = _thread_input_buffer()
+                try:
+                    derivatives.update(decode_with_derivatives(image_path, processed_image[0]))
+                finally:
+                    if hasattr(image_path, 'seek'):
+                        image_path.seek(0)
+
+            if not self.can_predict():
                 # Return mock prediction if model is not available
                 return self._mock_prediction()
             
             # Preprocess the image
-            processed_image = self.preprocess_image(image_path)
-            
-            # Make prediction
-            prediction = self.model.predict(processed_image)
-            
-            # Extract quality score (assuming model outputs probability for "Good")
-            quality_score = float(prediction[0][0])
+            if processed_image is None:
+                processed_image = self.preprocess_image_fast(image_path)
             
-            # Determine quality label based on threshold
-            quality_label = "good" if quality_score > 0.4 else "bad"
+            # Make prediction, coalesced with concurrent callers when batching is on
+            with stage('predict'):
+                if self.batcher is not None:
+                    quality_score = self.batcher.predict(processed_image)
+                else:
+                    quality_score = self.predict_scores(processed_image)[0]
             
-            # Calculate confidence (distance from threshold)
-            confidence = abs(quality_score - 0.4) * 2.5  # Scale to 0-1
-            confidence = min(confidence, 1.0)
-            
-            return {
-                'quality_label': quality_label,
-                'quality_score': quality_score,
-                'confidence': confidence
-            }
+            return self.result_from_score(quality_score)
             
         except Exception as e:
-            logger.error(f"Error making prediction: {str(e)}")
-            return self._mock_prediction()
+            logger.exception(f"Error making prediction, returning a mock result: {str(e)}")
+            return self._mock_prediction(reason='error')
+
+    def predict_tiled(self, image_source, derivatives=None):
+        """Score overlapping 200x200 tiles of an image instead of one downscaled copy.
+
+        The image is decoded at up to CROP_TILE_MAX_EDGE pixels and cut into
+        tiles overlapping by CROP_TILE_OVERLAP (see tile_batch). All tiles are
+        scored in one predict_scores call. The result carries the usual
+        label/score/confidence for the mean tile score, plus a ``tiles`` entry
+        with the per-tile heatmap (rows x cols, top-left first). Tiled scores
+        differ from whole-image scores, so model_version gets a ``+tiled``
+        suffix and the two never share cached results.
+        """
+        tile = MODEL_INPUT_SIZE[0]
+        max_edge = getattr(settings, 'CROP_TILE_MAX_EDGE', 1200)
+        overlap = getattr(settings, 'CROP_TILE_OVERLAP', 0.25)
+        stride = max(1, int(round(tile * (1.0 - overlap))))
+        try:
+            try:
+                with stage('decode'):
+                    opened = Image.open(image_source)
+                    original_width = opened.size[0]
+                    opened.draft('RGB', (max_edge, max_edge))
+                    decoded = opened.convert('RGB')
+            finally:
+                if hasattr(image_source, 'seek'):
+                    image_source.seek(0)
+            if derivatives is not None:
+                name = image_source if isinstance(image_source, str) else getattr(image_source, 'name', '')
+                with stage('derivatives'):
+                    derivatives.update(render_derivatives(decoded, name))
+            with stage('tile'):
+                image = fit_for_tiles(decoded, max_edge)
+                batch, (rows, cols), (ys, xs) = tile_batch(np.asarray(image), tile, stride)
+                # Tile pixels per original pixel (draft decoding already downscaled JPEGs)
+                scale = image.size[0] / original_width
+
+            if not self.can_predict():
+                return self._mock_prediction()
+            with stage('predict'):
+                scores = np.asarray(self.predict_scores(batch), dtype=np.float64)
+        except Exception as e:
+            logger.exception(f"Error making tiled prediction, returning a mock result: {str(e)}")
+            return self._mock_prediction(reason='error')
+
+        result = self.result_from_score(scores.mean())
+        if result['model_version']:
+            result['model_version'] = f"{result['model_version']}+tiled"
+        result['tiles'] = {
+            'rows': rows,
+            'cols': cols,
+            'tile_size': tile,
+            'stride': stride,
+            # Tile offsets are in original image pixels; a tile spans tile_size / scale of them
+            'scale': round(scale, 6),
+            'ys': [round(int(y) / scale) for y in ys],
+            'xs': [round(int(x) / scale) for x in xs],
+            'heatmap': np.round(scores.reshape(rows, cols), 4).tolist(),
+            'min_score': round(float(scores.min()), 4),
+            'max_score': round(float(scores.max()), 4),
+            'good_fraction': round(float((scores > QUALITY_THRESHOLD).mean()), 4),
+        }
+        return result
+
+    def stats(self):
+        """Inference metrics for this process"""
+        return {
+            'model_loaded': self.model is not None,
+            'inference_pool': str(self.pool_client.address) if self.pool_client is not None else None,
+            'batching': self.batcher.stats() if self.batcher is not None else None,
+        }
     
-    def _mock_prediction(self):
-        """Return mock prediction when model is not available"""
+    def _mock_prediction(self, reason='model_unavailable'):
+        """Return mock prediction when model is not available.
+
+        Every fallback is counted (``mock_fallback.<reason>`` in /api/metrics/)
+        so a missing or failing model doesn't go unnoticed.
+        """
         import random
+        pipeline_metrics.increment(f"mock_fallback.{reason}")
         quality_score = random.uniform(0.3, 0.8)
-        quality_label = "good" if quality_score > 0.4 else "bad"
+        quality_label = "good" if quality_score > QUALITY_THRESHOLD else "bad"
         confidence = random.uniform(0.6, 0.9)
         
         return {
             'quality_label': quality_label,
             'quality_score': quality_score,
-            'confidence': confidence
+            'confidence': confidence,
+            'model_version': MOCK_MODEL_VERSION,
         }
 
+
 # Global instance
 predictor = CropQualityPredictor()
-
-
-
@@ -0,0 +1,159 @@
+"""Memory-mapped on-disk layout for the crop quality model.
+
+A pickled model is read into each process's private heap. The mapped layout
+splits it into a small pickled skeleton (the model object graph with every
+large numpy array replaced by a reference) and one ``.npy`` file per array:
+
+    crop_quality_model.mmap/
+        manifest.json      format version, array shapes/dtypes/checksums
+        skeleton.pkl       the model with arrays stored as references
+        arrays/0000.npy    weights, memory-mapped read-only when loading
+
+Loading only unpickles the skeleton and maps the arrays, so it is nearly
+instant, and all processes serving the same files share the weight pages
+through the OS page cache instead of holding private copies.
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+SKELETON_NAME = 'skeleton.pkl'
+ARRAYS_DIR = 'arrays'
+
+# Smaller arrays stay inline in the skeleton; mapping them isn't worth a file
+DEFAULT_MIN_BYTES = 64 * 1024
+
+
+def is_mapped_model(path):
+    """Whether ``path`` is a directory in the mapped model layout"""
+    return bool(path) and os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+class _ArrayExtractingPickler(pickle.Pickler):
+    def __init__(self, file, min_bytes):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.min_bytes = min_bytes
+        self.arrays = []
+        self._seen = {}
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray and not isinstance(obj, np.memmap):
+            return None
+        if obj.dtype.hasobject or obj.nbytes < self.min_bytes:
+            return None
+        key = id(obj)
+        if key not in self._seen:
+            self._seen[key] = len(self.arrays)
+            self.arrays.append(obj)
+        return ('array', self._seen[key])
+
+
+class _MappedUnpickler(pickle.Unpickler):
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind != 'array':
+            raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+        return self.arrays[index]
+
+
+def export_mapped_model(model, directory, min_bytes=DEFAULT_MIN_BYTES):
+    """Write ``model`` to ``directory`` in the mapped layout and return its manifest.
+
+    The directory is built next to the destination and swapped in with a
+    rename, so processes never see a half-written model.
+    """
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.model-', dir=parent)
+    try:
+        buffer = io.BytesIO()
+        pickler = _ArrayExtractingPickler(buffer, min_bytes)
+        pickler.dump(model)
+        skeleton = buffer.getvalue()
+        with open(os.path.join(staging, SKELETON_NAME), 'wb') as f:
+            f.write(skeleton)
+
+        os.makedirs(os.path.join(staging, ARRAYS_DIR))
+        entries = []
+        for index, array in enumerate(pickler.arrays):
+            name = f"{index:04d}.npy"
+            array = np.ascontiguousarray(array)
+            np.save(os.path.join(staging, ARRAYS_DIR, name), array, allow_pickle=False)
+            entries.append({
+                'file': f"{ARRAYS_DIR}/{name}",
+                'shape': list(array.shape),
+                'dtype': array.dtype.str,
+                'sha256': hashlib.sha256(array.data).hexdigest(),
+            })
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'model_class': f"{type(model).__module__}.{type(model).__qualname__}",
+            'skeleton_sha256': hashlib.sha256(skeleton).hexdigest(),
+            'arrays': entries,
+            'mapped_bytes': int(sum(a.nbytes for a in pickler.arrays)),
+            'inline_bytes': len(skeleton),
+        }
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(directory):
+            retired = directory + '.old'
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(directory, retired)
+            os.replace(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.replace(staging, directory)
+        return manifest
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported mapped model format {manifest.get('format_version')!r} in {directory}")
+    return manifest
+
+
+def load_mapped_model(directory, mmap_mode='r'):
+    """Rebuild a model exported by export_mapped_model over memory-mapped weights.
+
+    With the default read-only mode, a model that writes to its weights in
+    place fails loudly; pass ``mmap_mode='c'`` for private copy-on-write pages.
+    """
+    manifest = read_manifest(directory)
+    arrays = []
+    for entry in manifest['arrays']:
+        array = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if list(array.shape) != entry['shape'] or array.dtype.str != entry['dtype']:
+            raise ValueError(f"{entry['file']} does not match the manifest in {directory}")
+        arrays.append(array)
+
+    with open(os.path.join(directory, SKELETON_NAME), 'rb') as f:
+        skeleton = f.read()
+    if hashlib.sha256(skeleton).hexdigest() != manifest['skeleton_sha256']:
+        raise ValueError(f"{SKELETON_NAME} does not match the manifest in {directory}")
+    return _MappedUnpickler(io.BytesIO(skeleton), arrays).load()
+
+
+def mapped_model_version(directory):
+    """Short content hash of a mapped model, from its manifest (no weight reads)"""
+    with open(os.path.join(directory, MANIFEST_NAME), 'rb') as f:
+        return f"sha256:{hashlib.sha256(f.read()).hexdigest()[:16]}"
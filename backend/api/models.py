@@ -1,7 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
 
+from .storage import get_crop_image_storage
+
+# Largest BigAutoField (DEFAULT_AUTO_FIELD) value; larger ids overflow the
+# database driver instead of simply matching nothing
+MAX_ID = 2 ** 63 - 1
+
 
 class UserProfile(models.Model):
     """Extended user profile for different user types"""
@@ -56,6 +62,15 @@ class SupplyChainItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Listing filters (api/filters.py), each ending in the
+            # (updated_at, id) keyset the pages are sought by
+            models.Index(fields=['current_holder', 'status', 'updated_at', 'id'], name='api_item_holder_status_idx'),
+            models.Index(fields=['farmer', 'updated_at', 'id'], name='api_item_farmer_updated_idx'),
+            models.Index(fields=['product', 'updated_at', 'id'], name='api_item_product_updated_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.product.name} - {self.status}"
 
@@ -76,6 +91,15 @@ class Transaction(models.Model):
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # A user's sent and received transactions by date, keyset-paged
+            models.Index(fields=['from_user', 'created_at', 'id'], name='api_tx_from_created_idx'),
+            models.Index(fields=['to_user', 'created_at', 'id'], name='api_tx_to_created_idx'),
+            # Each hop of the provenance walk (api/provenance.py) is one seek
+            models.Index(fields=['supply_chain_item', 'from_user', 'created_at', 'id'], name='api_tx_item_from_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.transaction_type} - {self.supply_chain_item.product.name}"
 
@@ -90,68 +114,116 @@ class CropQualityPrediction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='crop_predictions')
     image = models.ImageField(
         upload_to='crop_images/',
+        storage=get_crop_image_storage,
+        max_length=255,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text='Upload an image of the crop for quality prediction'
     )
+    thumbnail = models.ImageField(
+        upload_to='crop_images/derivatives/', storage=get_crop_image_storage, max_length=255,
+        blank=True, help_text='Small rendition for listings'
+    )
+    medium = models.ImageField(
+        upload_to='crop_images/derivatives/', storage=get_crop_image_storage, max_length=255,
+        blank=True, help_text='Medium rendition for detail views'
+    )
     predicted_quality = models.CharField(max_length=10, choices=QUALITY_CHOICES)
     quality_score = models.FloatField(help_text='Quality score from 0 to 1')
     prediction_confidence = models.FloatField(help_text='Model confidence in prediction')
+    content_hash = models.CharField(max_length=64, blank=True, default='', help_text='SHA-256 of the uploaded image bytes')
+    model_version = models.CharField(max_length=64, blank=True, default='', help_text='Version of the model that made the prediction')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Prediction cache lookups for re-uploaded photos
+            models.Index(fields=['content_hash', 'model_version'], name='api_crop_hash_version_idx'),
+            # A user's predictions newest first, paged by (created_at, id) keyset
+            models.Index(fields=['user', 'created_at', 'id'], name='api_crop_user_created_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # post_save updates the user's daily rollup (api/prediction_stats.py);
+        # commit the row and its rollup together
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.user.username} - {self.predicted_quality} ({self.quality_score:.2f})"
-        return f"{self.transaction_type} - {self.supply_chain_item.product.name}"
 
 
-class CropQualityPrediction(models.Model):
-    """Model for storing crop quality predictions"""
-    QUALITY_CHOICES = [
-        ('good', 'Good'),
-        ('bad', 'Bad'),
+class PredictionJob(models.Model):
+    """Queued crop quality prediction, processed by `run_prediction_worker`"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='crop_predictions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prediction_jobs')
     image = models.ImageField(
         upload_to='crop_images/',
-        validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
-        help_text='Upload an image of the crop for quality prediction'
+        storage=get_crop_image_storage,
+        max_length=255,
+        validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]
+    )
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    prediction = models.OneToOneField(
+        CropQualityPrediction, on_delete=models.SET_NULL, null=True, blank=True, related_name='job'
     )
-    predicted_quality = models.CharField(max_length=10, choices=QUALITY_CHOICES)
-    quality_score = models.FloatField(help_text='Quality score from 0 to 1')
-    prediction_confidence = models.FloatField(help_text='Model confidence in prediction')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest queued jobs first
+            models.Index(fields=['status', 'created_at'], name='api_job_status_created_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.predicted_quality} ({self.quality_score:.2f})"
-        return f"{self.transaction_type} - {self.supply_chain_item.product.name}"
+        return f"Job {self.pk} ({self.status}) for {self.user.username}"
 
 
-class CropQualityPrediction(models.Model):
-    """Model for storing crop quality predictions"""
-    QUALITY_CHOICES = [
-        ('good', 'Good'),
-        ('bad', 'Bad'),
-    ]
-    
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='crop_predictions')
-    image = models.ImageField(
-        upload_to='crop_images/',
-        validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
-        help_text='Upload an image of the crop for quality prediction'
-    )
-    predicted_quality = models.CharField(max_length=10, choices=QUALITY_CHOICES)
-    quality_score = models.FloatField(help_text='Quality score from 0 to 1')
-    prediction_confidence = models.FloatField(help_text='Model confidence in prediction')
+class StoredBlob(models.Model):
+    """Reference count of a content-addressed crop image file (see api/storage.py)"""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
+
+
+class PredictionDailyStats(models.Model):
+    """Per-user, per-day rollup of crop quality predictions (see api/prediction_stats.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prediction_daily_stats')
+    day = models.DateField()
+    total = models.IntegerField(default=0)
+    good = models.IntegerField(default=0)
+    bad = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0.0, help_text='Sum of quality_score, for the average')
+    
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['user', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='api_prediction_stats_user_day_uniq'),
+        ]
+    
+    @property
+    def average_score(self):
+        return self.score_sum / self.total if self.total else None
     
     def __str__(self):
-        return f"{self.user.username} - {self.predicted_quality} ({self.quality_score:.2f})"
\ No newline at end of file
+        return f"{self.user_id} {self.day}: {self.good}/{self.total} good"
@@ -0,0 +1,134 @@
+"""Keyset ("seek") pagination for listings ordered newest first.
+
+Page N is fetched by seeking past the last row of page N-1 instead of
+OFFSET-ing over everything before it, so with an index ending in
+(created_at, id) every page costs the same however deep it is.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import MAX_ID
+
+
+class KeysetPagination(BasePagination):
+    """Opaque-cursor pagination over (created_at, id), newest first.
+
+    The seek condition is written as ``created_at <= t AND NOT (created_at =
+    t AND id >= i)`` rather than an OR of the two keys, so databases turn it
+    into an index range starting at the cursor and only filter ties.
+    Responses look like DRF's CursorPagination: ``next``, ``previous`` and
+    ``results``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    time_field = 'created_at'
+    id_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            return page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def encode_cursor(self, row, reverse):
+        # Rows are model instances, or dicts from a .values() queryset
+        get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+        value = f"{'p' if reverse else 'n'}|{get(self.time_field).isoformat()}|{get(self.id_field)}"
+        encoded = base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            direction, timestamp, pk = value.split('|')
+            position = parse_datetime(timestamp)
+            pk = int(pk)
+            if direction not in ('n', 'p') or position is None or abs(pk) > MAX_ID:
+                raise ValueError(value)
+            return position, pk, direction == 'p'
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        time_field, id_field = self.time_field, self.id_field
+
+        if cursor is None:
+            reverse = False
+            rows = list(queryset.order_by(f'-{time_field}', f'-{id_field}')[:page_size + 1])
+        else:
+            position, pk, reverse = cursor
+            if reverse:
+                # Rows just newer than the cursor, nearest first, flipped below
+                seek = Q(**{f'{time_field}__gte': position}) & ~Q(**{time_field: position, f'{id_field}__lte': pk})
+                ordering = (time_field, id_field)
+            else:
+                seek = Q(**{f'{time_field}__lte': position}) & ~Q(**{time_field: position, f'{id_field}__gte': pk})
+                ordering = (f'-{time_field}', f'-{id_field}')
+            rows = list(queryset.filter(seek).order_by(*ordering)[:page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class UpdatedKeysetPagination(KeysetPagination):
+    """Keyset pagination over (updated_at, id), most recently changed first.
+
+    Rows updated while a client is paging move to the front, so they can be
+    skipped or repeated; that is the price of ordering by last change.
+    """
+    time_field = 'updated_at'
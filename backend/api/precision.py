@@ -0,0 +1,150 @@
+"""Inference precision modes for the crop quality model.
+
+``CROP_INFERENCE_PRECISION`` selects how the loaded model's numpy weights and
+its input batches are represented:
+
+- ``native``  leave the model as trained (the default)
+- ``float64`` weights and inputs in float64, the reference precision
+- ``float32`` weights and inputs in float32: half the memory, faster BLAS
+- ``int8``    post-training weight quantization: each weight matrix is
+              rounded to 8 bits per output channel (symmetric, one scale per
+              channel) and computed in float32
+
+numpy has no int8 matrix multiply, so ``int8`` models the accuracy of an
+int8-weight deployment rather than speeding up compute beyond float32. Use
+``python manage.py check_precision_parity`` before switching a deployment
+to a lower precision.
+"""
+import io
+import pickle
+
+import numpy as np
+
+PRECISIONS = ('native', 'float64', 'float32', 'int8')
+
+_INPUT_DTYPES = {
+    'native': None,
+    'float64': np.float64,
+    'float32': np.float32,
+    'int8': np.float32,
+}
+
+
+def input_dtype(precision):
+    """dtype that input batches are fed to the model in (None: as preprocessed)"""
+    return _INPUT_DTYPES[precision]
+
+
+def quantize_int8(weights):
+    """Symmetric per-output-channel int8 quantization: returns (values, scales)"""
+    weights = np.asarray(weights, dtype=np.float32)
+    if weights.ndim < 2:
+        scale = np.float32(np.abs(weights).max() / 127.0) if weights.size else np.float32(1.0)
+        scales = np.array(scale if scale > 0 else 1.0, dtype=np.float32)
+    else:
+        # The last axis is the output channel for dense (in, out) and
+        # conv (h, w, in, out) kernels
+        reduce_axes = tuple(range(weights.ndim - 1))
+        scales = np.abs(weights).max(axis=reduce_axes, keepdims=True) / np.float32(127.0)
+        scales[scales == 0] = 1.0
+    values = np.clip(np.rint(weights / scales), -127, 127).astype(np.int8)
+    return values, scales.astype(np.float32)
+
+
+def dequantize_int8(values, scales):
+    return values.astype(np.float32) * scales
+
+
+def _convert_array(array, precision):
+    if precision == 'float64':
+        return array.astype(np.float64, copy=False)
+    if precision == 'float32':
+        return array.astype(np.float32, copy=False)
+    # Biases and other vectors are a tiny share of the weights; keep them exact
+    if array.ndim < 2:
+        return array.astype(np.float32, copy=False)
+    return dequantize_int8(*quantize_int8(array))
+
+
+class _ArrayCollectingPickler(pickle.Pickler):
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = []
+        self._seen = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.kind != 'f':
+            return None
+        key = id(obj)
+        if key not in self._seen:
+            self._seen[key] = len(self.arrays)
+            self.arrays.append(obj)
+        return self._seen[key]
+
+
+class _ArrayReplacingUnpickler(pickle.Unpickler):
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, pid):
+        return self.arrays[pid]
+
+
+def cast_model(model, precision):
+    """Return a copy of ``model`` with its floating-point numpy weights converted.
+
+    Works on any model object whose weights are reachable numpy arrays (the
+    same requirement as the mapped model format). Arrays that already have
+    the target dtype are reused, so a float32 mapped model stays mapped.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown inference precision {precision!r}; choose from {', '.join(PRECISIONS)}")
+    if precision == 'native' or model is None:
+        return model
+    buffer = io.BytesIO()
+    pickler = _ArrayCollectingPickler(buffer)
+    pickler.dump(model)
+    converted = [_convert_array(array, precision) for array in pickler.arrays]
+    buffer.seek(0)
+    return _ArrayReplacingUnpickler(buffer, converted).load()
+
+
+def parity_report(model, inputs, precisions, reference='float64', threshold=0.4, labels=None, batch_size=32):
+    """Compare scores and labels of ``precisions`` against ``reference``.
+
+    ``inputs`` is an (N, 200, 200, 3) preprocessed batch. Returns one entry
+    per precision (reference included) with timing, the largest and mean
+    score differences from the reference, and the indices whose good/bad
+    label flipped across ``threshold``. With ``labels`` (True for good)
+    accuracy is reported too.
+    """
+    import time
+    from .ml_utils import model_scores
+
+    results = {}
+    scores = {}
+    for precision in [reference] + [p for p in precisions if p != reference]:
+        converted = cast_model(model, precision)
+        dtype = input_dtype(precision)
+        started = time.perf_counter()
+        scores[precision] = np.concatenate([
+            model_scores(converted, inputs[i:i + batch_size], dtype).astype(np.float64)
+            for i in range(0, len(inputs), batch_size)
+        ])
+        elapsed = time.perf_counter() - started
+        diff = np.abs(scores[precision] - scores[reference])
+        flipped = (scores[precision] > threshold) != (scores[reference] > threshold)
+        entry = {
+            'ms_per_image': round(elapsed * 1000.0 / max(len(inputs), 1), 3),
+            'max_abs_diff': float(diff.max()) if len(diff) else 0.0,
+            'mean_abs_diff': float(diff.mean()) if len(diff) else 0.0,
+            'label_flips': [int(i) for i in np.flatnonzero(flipped)],
+        }
+        if labels is not None:
+            known = np.array([label is not None for label in labels])
+            if known.any():
+                truth = np.array([bool(label) for label in labels])[known]
+                entry['accuracy'] = float(((scores[precision][known] > threshold) == truth).mean())
+        results[precision] = entry
+    return results
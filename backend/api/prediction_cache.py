@@ -0,0 +1,120 @@
+import hashlib
+import threading
+
+from .derivatives import derivatives_enabled
+from .ml_utils import MOCK_MODEL_VERSION, predictor
+from .models import CropQualityPrediction
+from .timing import stage
+
+
+def hash_upload(upload):
+    """SHA-256 of an uploaded file's bytes; the file is rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Reuses stored predictions for byte-identical re-uploads.
+
+    Backed by the (content_hash, model_version) index on
+    CropQualityPrediction, so a hit costs one indexed query and returns the
+    stored result and image file without running the model again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, content_hash, model_version):
+        if not model_version or model_version == MOCK_MODEL_VERSION:
+            return None
+        cached = (
+            CropQualityPrediction.objects
+            .filter(content_hash=content_hash, model_version=model_version)
+            .only('image', 'thumbnail', 'medium', 'predicted_quality', 'quality_score', 'prediction_confidence')
+            .order_by()
+            .first()
+        )
+        if cached is not None and not (cached.image and cached.image.storage.exists(cached.image.name)):
+            cached = None
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return cached
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+prediction_cache = PredictionCache()
+
+
+def predict_upload(upload):
+    """Predict an uploaded image, reusing the stored result for identical bytes.
+
+    Returns ``(fields, cached)``: the CropQualityPrediction field values to
+    save, with ``image`` (and the thumbnail/medium derivatives) set to the
+    existing file names on a cache hit or the new files otherwise, and
+    whether the result came from the cache.
+    """
+    with stage('hash'):
+        content_hash = hash_upload(upload)
+    with stage('cache_lookup'):
+        cached = prediction_cache.lookup(content_hash, predictor.model_version)
+    if cached is not None:
+        return {
+            'image': cached.image.name,
+            'thumbnail': cached.thumbnail.name,
+            'medium': cached.medium.name,
+            'predicted_quality': cached.predicted_quality,
+            'quality_score': cached.quality_score,
+            'prediction_confidence': cached.prediction_confidence,
+            'content_hash': content_hash,
+            'model_version': predictor.model_version,
+        }, True
+
+    derivatives = {} if derivatives_enabled() else None
+    prediction_result = predictor.predict_quality(upload, derivatives=derivatives)
+    return {
+        **(derivatives or {}),
+        'image': upload,
+        'predicted_quality': prediction_result['quality_label'],
+        'quality_score': prediction_result['quality_score'],
+        'prediction_confidence': prediction_result['confidence'],
+        'content_hash': content_hash,
+        'model_version': prediction_result['model_version'],
+    }, False
+
+
+def predict_upload_tiled(upload):
+    """Tiled prediction of an upload (see CropQualityPredictor.predict_tiled).
+
+    Returns ``(fields, tiles)``: the CropQualityPrediction field values and
+    the per-tile heatmap. Tiled results carry their own model_version and
+    are never answered from the cache, since the heatmap isn't stored.
+    """
+    with stage('hash'):
+        content_hash = hash_upload(upload)
+    derivatives = {} if derivatives_enabled() else None
+    prediction_result = predictor.predict_tiled(upload, derivatives=derivatives)
+    return {
+        **(derivatives or {}),
+        'image': upload,
+        'predicted_quality': prediction_result['quality_label'],
+        'quality_score': prediction_result['quality_score'],
+        'prediction_confidence': prediction_result['confidence'],
+        'content_hash': content_hash,
+        'model_version': prediction_result['model_version'],
+    }, prediction_result.get('tiles')
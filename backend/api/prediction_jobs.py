@@ -0,0 +1,222 @@
+"""Asynchronous crop quality predictions backed by the PredictionJob table.
+
+The web request only stores the upload and queues a job; one or more
+``python manage.py run_prediction_worker`` processes claim queued jobs in
+batches and score each batch with a single model call. The table is the
+queue, so no broker is needed.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+from .derivatives import derivatives_enabled
+from .ml_utils import MODEL_INPUT_SIZE, decode_with_derivatives, predictor, preprocess_into
+from .models import CropQualityPrediction, PredictionJob
+from .prediction_cache import hash_upload, prediction_cache
+from .prediction_stats import record_predictions
+from .storage import retain_files
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TOKEN_SALT = 'api.prediction_jobs.events'
+
+
+def events_token(job):
+    """Signed token that opens the job's events stream (EventSource cannot send an Authorization header)"""
+    return signing.dumps({'job': job.id, 'user': job.user_id}, salt=EVENTS_TOKEN_SALT)
+
+
+def events_token_user_id(token, job_id):
+    """Id of the user an events token was issued to for job_id; None if invalid, expired or for another job"""
+    try:
+        data = signing.loads(token, salt=EVENTS_TOKEN_SALT, max_age=settings.PREDICTION_JOB_EVENTS_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get('job') != job_id:
+        return None
+    return data.get('user')
+
+
+def submit_job(user, upload):
+    """Store an upload and queue it for prediction.
+
+    Byte-identical re-uploads already predicted by the current model are
+    answered from the prediction cache and come back as finished jobs.
+    """
+    content_hash = hash_upload(upload)
+    cached = prediction_cache.lookup(content_hash, predictor.model_version)
+    if cached is None:
+        return PredictionJob.objects.create(user=user, image=upload, content_hash=content_hash)
+
+    with transaction.atomic():
+        prediction = CropQualityPrediction.objects.create(
+            user=user,
+            image=cached.image.name,
+            thumbnail=cached.thumbnail.name,
+            medium=cached.medium.name,
+            predicted_quality=cached.predicted_quality,
+            quality_score=cached.quality_score,
+            prediction_confidence=cached.prediction_confidence,
+            content_hash=content_hash,
+            model_version=predictor.model_version,
+        )
+        return PredictionJob.objects.create(
+            user=user,
+            image=cached.image.name,
+            content_hash=content_hash,
+            status=PredictionJob.STATUS_DONE,
+            finished_at=timezone.now(),
+            prediction=prediction,
+        )
+
+
+def requeue_stale_jobs(stale_after, max_attempts):
+    """Return jobs whose worker died mid-batch to the queue (or fail them)"""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = PredictionJob.objects.filter(status=PredictionJob.STATUS_RUNNING, claimed_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=PredictionJob.STATUS_FAILED,
+        error='Worker did not finish the job',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(status=PredictionJob.STATUS_QUEUED, claim_token='')
+    return requeued, failed
+
+
+def claim_jobs(limit):
+    """Atomically claim up to ``limit`` of the oldest queued jobs.
+
+    On PostgreSQL concurrent workers skip each other's locked rows; on SQLite
+    the conditional UPDATE is the claim, and rows another worker won are
+    simply not returned because they carry that worker's token.
+    """
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        ids = list(
+            PredictionJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=PredictionJob.STATUS_QUEUED)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        PredictionJob.objects.filter(id__in=ids, status=PredictionJob.STATUS_QUEUED).update(
+            status=PredictionJob.STATUS_RUNNING,
+            claim_token=token,
+            claimed_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+    return list(
+        PredictionJob.objects.filter(claim_token=token, status=PredictionJob.STATUS_RUNNING)
+        .order_by('created_at', 'id')
+    )
+
+
+def _preprocess_jobs(jobs, out, max_workers):
+    # Decode each job's stored image into its row of ``out``; returns per-job
+    # (error, derivative files)
+    with_derivatives = derivatives_enabled()
+
+    def load(i):
+        try:
+            with jobs[i].image.open('rb') as f:
+                if with_derivatives:
+                    return None, decode_with_derivatives(f, out[i])
+                preprocess_into(f, out[i])
+            return None, {}
+        except Exception as e:
+            return str(e) or e.__class__.__name__, {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        return list(pool.map(load, range(len(jobs))))
+
+
+def process_jobs(jobs, max_workers=4):
+    """Score a batch of claimed jobs with one model call and store the results"""
+    if not jobs:
+        return 0
+    width, height = MODEL_INPUT_SIZE
+    batch = np.empty((len(jobs), height, width, 3), dtype=np.float32)
+    loaded = _preprocess_jobs(jobs, batch, max_workers)
+    errors = [error for error, _ in loaded]
+    ready = [i for i, error in enumerate(errors) if error is None]
+
+    if not predictor.can_predict():
+        results = {i: predictor._mock_prediction() for i in ready}
+    elif ready:
+        try:
+            scores = predictor.predict_scores(batch[ready])
+        except Exception as e:
+            # Leave the jobs running; they are retried once they go stale
+            logger.error(f"Error scoring prediction job batch: {str(e)}")
+            return 0
+        results = {i: predictor.result_from_score(score) for i, score in zip(ready, scores)}
+    else:
+        results = {}
+
+    pending = []
+    for i in ready:
+        prediction = CropQualityPrediction(
+            user_id=jobs[i].user_id,
+            image=jobs[i].image.name,
+            predicted_quality=results[i]['quality_label'],
+            quality_score=results[i]['quality_score'],
+            prediction_confidence=results[i]['confidence'],
+            content_hash=jobs[i].content_hash,
+            model_version=results[i]['model_version'],
+        )
+        for field, content in loaded[i][1].items():
+            getattr(prediction, field).save(content.name, content, save=False)
+        pending.append(prediction)
+
+    now = timezone.now()
+    with transaction.atomic():
+        predictions = CropQualityPrediction.objects.bulk_create(pending)
+        # bulk_create sends no post_save
+        retain_files(predictions)
+        record_predictions(predictions)
+        for i, prediction in zip(ready, predictions):
+            jobs[i].prediction = prediction
+            jobs[i].status = PredictionJob.STATUS_DONE
+        for i, error in enumerate(errors):
+            if error is not None:
+                jobs[i].status = PredictionJob.STATUS_FAILED
+                jobs[i].error = f"Could not read image: {error}"
+        for job in jobs:
+            job.finished_at = now
+        PredictionJob.objects.bulk_update(jobs, ['prediction', 'status', 'error', 'finished_at'])
+    return len(ready)
+
+
+def run_worker(batch_size=None, poll_interval=None, once=False, stop=None):
+    """Claim and process job batches until ``stop`` is set (or the queue drains with ``once``)"""
+    batch_size = batch_size or settings.PREDICTION_JOB_BATCH_SIZE
+    poll_interval = settings.PREDICTION_JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    processed = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        requeue_stale_jobs(settings.PREDICTION_JOB_STALE_AFTER, settings.PREDICTION_JOB_MAX_ATTEMPTS)
+        jobs = claim_jobs(batch_size)
+        if jobs:
+            started = time.perf_counter()
+            done = process_jobs(jobs)
+            processed += done
+            logger.info(f"Processed {done}/{len(jobs)} prediction jobs in {time.perf_counter() - started:.3f}s")
+            continue
+        if once:
+            break
+        if stop is not None:
+            stop.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+    return processed
@@ -0,0 +1,126 @@
+"""Per-user daily rollups of crop quality predictions.
+
+PredictionDailyStats holds one row per (user, day) with the prediction
+count, good/bad counts and the sum of quality scores, so dashboards read a
+row per day instead of every prediction. Rows are kept current in the same
+transaction as the predictions they count:
+
+- post_save (CropQualityPrediction.save is atomic) and post_delete add and
+  subtract each prediction;
+- bulk inserts, which send no post_save, call record_predictions();
+- ``python manage.py rebuild_prediction_stats`` recomputes them from the
+  predictions table (after bulk SQL or restoring a backup).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def _day(created_at):
+    return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+
+def record_predictions(predictions, sign=1):
+    """Add (sign=1) or remove (sign=-1) predictions from their users' daily rollups"""
+    from .models import PredictionDailyStats
+
+    deltas = defaultdict(lambda: [0, 0, 0, 0.0])
+    for prediction in predictions:
+        delta = deltas[prediction.user_id, _day(prediction.created_at)]
+        delta[0] += sign
+        delta[1] += sign if prediction.predicted_quality == 'good' else 0
+        delta[2] += sign if prediction.predicted_quality == 'bad' else 0
+        delta[3] += sign * prediction.quality_score
+
+    for (user_id, day), (total, good, bad, score_sum) in deltas.items():
+        rows = PredictionDailyStats.objects.filter(user_id=user_id, day=day)
+        changes = {
+            'total': F('total') + total, 'good': F('good') + good,
+            'bad': F('bad') + bad, 'score_sum': F('score_sum') + score_sum,
+        }
+        # Removals never create rows: the user (and with it the rollup) may
+        # be in the middle of a cascade delete
+        if rows.update(**changes) or sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                PredictionDailyStats.objects.create(
+                    user_id=user_id, day=day, total=total, good=good, bad=bad, score_sum=score_sum
+                )
+        except IntegrityError:
+            # Another transaction created the row first
+            rows.update(**changes)
+
+
+def record_prediction_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_predictions([instance])
+
+
+def record_prediction_deleted(sender, instance, **kwargs):
+    record_predictions([instance], sign=-1)
+
+
+def rebuild_daily_stats(user_ids=None):
+    """Recompute the rollups (of the given users, or everyone) from the predictions; returns the row count"""
+    from .models import CropQualityPrediction, PredictionDailyStats
+
+    predictions = CropQualityPrediction.objects.all()
+    stats = PredictionDailyStats.objects.all()
+    if user_ids is not None:
+        predictions = predictions.filter(user_id__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+    aggregates = (
+        predictions.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(
+            total=Count('id'),
+            good=Count('id', filter=Q(predicted_quality='good')),
+            bad=Count('id', filter=Q(predicted_quality='bad')),
+            score_sum=Sum('quality_score'),
+        )
+    )
+    with transaction.atomic():
+        stats.delete()
+        rows = PredictionDailyStats.objects.bulk_create(
+            [PredictionDailyStats(**row) for row in aggregates.iterator()], batch_size=1000
+        )
+    return len(rows)
+
+
+def _summary(total, good, bad, score_sum):
+    return {
+        'total': total,
+        'good': good,
+        'bad': bad,
+        'good_ratio': round(good / total, 4) if total else None,
+        'average_score': round(score_sum / total, 4) if total else None,
+    }
+
+
+def user_stats(user_id, days):
+    """All-time totals and a zero-filled daily series for the last ``days`` days"""
+    from .models import PredictionDailyStats
+
+    rows = PredictionDailyStats.objects.filter(user_id=user_id)
+    totals = rows.aggregate(total=Sum('total'), good=Sum('good'), bad=Sum('bad'), score_sum=Sum('score_sum'))
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    by_day = {row.day: row for row in rows.filter(day__gte=first, day__lte=today)}
+    daily = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = by_day.get(day)
+        counts = (row.total, row.good, row.bad, row.score_sum) if row else (0, 0, 0, 0.0)
+        daily.append({'date': day.isoformat(), **_summary(*counts)})
+    return {
+        'user': user_id,
+        'totals': _summary(totals['total'] or 0, totals['good'] or 0, totals['bad'] or 0, totals['score_sum'] or 0.0),
+        'days': days,
+        'daily': daily,
+    }
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import threading
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Board entries are keyed by lower-cased commodity and state names. The empty
+# state key holds the all-India figure used when no state is given.
+ALL_STATES = ''
+
+_cache_lock = threading.Lock()
+_cache = {'path': None, 'mtime': None, 'board': None}
+
+
+def normalize_key(value):
+    """Normalize a commodity/state name into a board key"""
+    return ' '.join(str(value or '').split()).lower()
+
+
+def write_price_board(board, path):
+    """Atomically write the board as compact JSON"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.price_board.', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(board, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_price_board(path=None):
+    """Return the parsed price board, reloading only when the file changes.
+
+    Returns None if the board has not been built yet.
+    """
+    path = str(path or settings.PRICE_BOARD_PATH)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _cache_lock:
+        if _cache['path'] == path and _cache['mtime'] == mtime:
+            return _cache['board']
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                board = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading price board from {path}: {str(e)}")
+            return None
+        _cache.update(path=path, mtime=mtime, board=board)
+        return board
+
+
+def lookup_price(board, commodity, state=None, fallback=True):
+    """Look up the per-kg price for a commodity, optionally within a state.
+
+    A state without its own entry falls back to the all-India price, as the
+    live estimator's trend lookup does; pass ``fallback=False`` to disable.
+    """
+    states = board.get('prices', {}).get(normalize_key(commodity))
+    if not states:
+        return None
+    if state:
+        price = states.get(normalize_key(state))
+        if price is not None or not fallback:
+            return price
+    return states.get(ALL_STATES)
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from django.conf import settings
+import logging
+
+from ml.predict_price import (
+    async_fetch_current_weather, async_geocode_location_and_state, build_weather_snapshot,
+    compute_trend_stats, empty_weather_snapshot, estimate_price, load_dataset, new_async_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# pandas work for the async price view runs here so it never blocks the event loop
+_estimator_pool = ThreadPoolExecutor(
+    max_workers=settings.PRICE_ESTIMATOR_THREADS,
+    thread_name_prefix='price-estimator'
+)
+
+_dataset_lock = threading.Lock()
+_dataset_cache = {'path': None, 'mtime': None, 'df': None}
+
+# Pooled HTTP client shared by every request of an ASGI worker, opened and
+# closed by the lifespan handler in sih_backend/asgi.py
+_shared_client = None
+
+
+def get_dataset():
+    """Return the price dataset, loading it once per process (and on change)"""
+    path = str(settings.PRICE_DATASET_CSV)
+    mtime = os.stat(path).st_mtime_ns
+    with _dataset_lock:
+        if _dataset_cache['path'] != path or _dataset_cache['mtime'] != mtime:
+            _dataset_cache.update(path=path, mtime=mtime, df=load_dataset(path))
+        return _dataset_cache['df']
+
+
+async def open_http_client():
+    """Create the worker's shared client (ASGI lifespan startup)"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = new_async_client(settings.PRICE_HTTP_MAX_CONNECTIONS)
+
+
+async def close_http_client():
+    """Close the worker's shared client (ASGI lifespan shutdown)"""
+    global _shared_client
+    client, _shared_client = _shared_client, None
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def _http_client():
+    if _shared_client is not None:
+        yield _shared_client
+        return
+    # Without a lifespan (WSGI runs each async view on a new event loop via
+    # async_to_sync) a client could never be reused: use one per request
+    client = new_async_client(settings.PRICE_HTTP_MAX_CONNECTIONS)
+    if client is None:
+        yield None
+        return
+    async with client:
+        yield client
+
+
+def _trend_for(crop, state):
+    df = get_dataset()
+    trend = compute_trend_stats(df, crop, state)
+    if state and (not trend or trend.get('rows', 0) == 0):
+        trend = compute_trend_stats(df, crop, None)
+    return trend
+
+
+async def estimate_price_async(crop, kilograms, location, offline=False):
+    """Estimate a crop price without blocking the event loop.
+
+    Geocoding and weather calls are awaited on a non-blocking client and the
+    dataset trend is computed in a thread pool while the weather request is
+    in flight. With ``offline`` only the dataset is used.
+    """
+    loop = asyncio.get_running_loop()
+
+    if offline:
+        trend = await loop.run_in_executor(_estimator_pool, _trend_for, crop, None)
+        return await loop.run_in_executor(
+            _estimator_pool, estimate_price, crop, kilograms, location, empty_weather_snapshot(), trend
+        )
+
+    async with _http_client() as client:
+        lat, lon, name, country, state = await async_geocode_location_and_state(location, client=client)
+        label = f"{name}, {country}" if country else name
+
+        weather_json, trend = await asyncio.gather(
+            async_fetch_current_weather(lat, lon, client=client),
+            loop.run_in_executor(_estimator_pool, _trend_for, crop, state if country == 'India' else None),
+            return_exceptions=True,
+        )
+    if isinstance(trend, BaseException):
+        raise trend
+    if isinstance(weather_json, BaseException):
+        logger.warning(f"Weather lookup failed for {label}, using dataset only: {str(weather_json)}")
+        weather_json = {}
+
+    snapshot = build_weather_snapshot(label, country, lat, lon, weather_json)
+    return await loop.run_in_executor(_estimator_pool, estimate_price, crop, kilograms, label, snapshot, trend)
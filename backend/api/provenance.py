@@ -0,0 +1,156 @@
+"""Custody chain (provenance) of a supply chain item in one recursive query.
+
+The chain starts with the item's farmer. Each hop is the earliest later
+transaction of the item sent by the current holder, and the receiver
+becomes the next holder. Following hops one query at a time costs a round
+trip per hop. Here a recursive CTE walks them inside the database instead,
+each hop being one seek on the (supply_chain_item, from_user, created_at,
+id) index. The same statement also summarizes the crop quality predictions
+each holder made while holding the item. The SQL is plain SQL:2003 plus
+window functions, which SQLite (3.25+) and PostgreSQL both run.
+
+The holder can also change without a transaction (e.g. an ingested status
+event with a ``holder``). When the item's current holder is not the last
+holder the transactions lead to, the chain ends with a ``holder_change`` hop
+for it, held from the item's last update: the time of the change itself is
+not recorded.
+"""
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CropQualityPrediction, SupplyChainItem, Transaction
+
+
+def _provenance_sql():
+    qn = connection.ops.quote_name
+    items = qn(SupplyChainItem._meta.db_table)
+    transactions = qn(Transaction._meta.db_table)
+    predictions = qn(CropQualityPrediction._meta.db_table)
+    users = qn(SupplyChainItem._meta.get_field('farmer').related_model._meta.db_table)
+    return f"""
+        WITH RECURSIVE walked (hop, tx_id, holder_id, started_at) AS (
+            SELECT 0, CAST(NULL AS BIGINT), i.farmer_id, i.created_at
+            FROM {items} i
+            WHERE i.id = %s
+            UNION ALL
+            SELECT c.hop + 1, t.id, t.to_user_id, t.created_at
+            FROM walked c
+            JOIN {transactions} t ON t.id = (
+                SELECT n.id FROM {transactions} n
+                WHERE n.supply_chain_item_id = %s
+                  AND n.from_user_id = c.holder_id
+                  AND (c.tx_id IS NULL
+                       OR n.created_at > c.started_at
+                       OR (n.created_at = c.started_at AND n.id > c.tx_id))
+                ORDER BY n.created_at, n.id
+                LIMIT 1
+            )
+            WHERE c.hop < %s
+        ),
+        chain AS (
+            SELECT hop, tx_id, holder_id, started_at FROM walked
+            UNION ALL
+            SELECT last.hop + 1, CAST(NULL AS BIGINT), i.current_holder_id,
+                   CASE WHEN i.updated_at > last.started_at THEN i.updated_at ELSE last.started_at END
+            FROM {items} i
+            JOIN (SELECT hop, holder_id, started_at FROM walked ORDER BY hop DESC LIMIT 1) last
+              ON i.current_holder_id <> last.holder_id
+            WHERE i.id = %s
+        ),
+        custody AS (
+            SELECT hop, tx_id, holder_id, started_at,
+                   LEAD(started_at) OVER (ORDER BY hop) AS ended_at
+            FROM chain
+        ),
+        quality AS (
+            SELECT cu.hop,
+                   COUNT(p.id) AS predictions,
+                   SUM(CASE WHEN p.predicted_quality = 'good' THEN 1 ELSE 0 END) AS good,
+                   AVG(p.quality_score) AS average_score,
+                   MAX(p.id) AS latest_id
+            FROM custody cu
+            LEFT JOIN {predictions} p
+              ON p.user_id = cu.holder_id
+             AND p.created_at >= cu.started_at
+             AND (cu.ended_at IS NULL OR p.created_at < cu.ended_at)
+            GROUP BY cu.hop
+        )
+        SELECT cu.hop,
+               CASE WHEN cu.hop = 0 THEN 'farmer'
+                    WHEN cu.tx_id IS NULL THEN 'holder_change'
+                    ELSE 'transaction' END,
+               cu.holder_id, u.username, cu.started_at, cu.ended_at,
+               t.id, t.from_user_id, t.transaction_type, t.amount, t.quantity,
+               q.predictions, q.good, q.average_score,
+               lp.id, lp.predicted_quality, lp.quality_score, lp.created_at
+        FROM custody cu
+        JOIN quality q ON q.hop = cu.hop
+        JOIN {users} u ON u.id = cu.holder_id
+        LEFT JOIN {transactions} t ON t.id = cu.tx_id
+        LEFT JOIN {predictions} lp ON lp.id = q.latest_id
+        ORDER BY cu.hop
+    """
+
+
+def _datetime(value):
+    # Computed CTE columns lose their declared type, so SQLite returns text
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
+def _decimal(value):
+    # A string, as the DecimalFields of the serializers render it
+    return None if value is None else str(Decimal(str(value)).quantize(Decimal('0.01')))
+
+
+def item_provenance(item_id, max_hops=None):
+    """Ordered custody chain of an item, farmer first; empty if the item does not exist"""
+    if max_hops is None:
+        max_hops = getattr(settings, 'PROVENANCE_MAX_HOPS', 1000)
+    with connection.cursor() as cursor:
+        cursor.execute(_provenance_sql(), [item_id, item_id, max_hops, item_id])
+        rows = cursor.fetchall()
+
+    chain = []
+    for (hop, via, holder_id, username, started_at, ended_at,
+         tx_id, from_user_id, transaction_type, amount, quantity,
+         predictions, good, average_score,
+         latest_id, latest_quality, latest_score, latest_at) in rows:
+        chain.append({
+            'hop': hop,
+            # farmer, transaction or holder_change (no transaction recorded)
+            'via': via,
+            'holder': {'id': holder_id, 'username': username},
+            'held_from': _datetime(started_at),
+            'held_until': _datetime(ended_at),
+            'transaction': None if tx_id is None else {
+                'id': tx_id,
+                'from_user': from_user_id,
+                'transaction_type': transaction_type,
+                'amount': _decimal(amount),
+                'quantity': _decimal(quantity),
+            },
+            'quality': {
+                'predictions': predictions,
+                'good': good or 0,
+                'bad': predictions - (good or 0),
+                'average_score': None if average_score is None else round(float(average_score), 4),
+                'latest': None if latest_id is None else {
+                    'id': latest_id,
+                    'predicted_quality': latest_quality,
+                    'quality_score': latest_score,
+                    'created_at': _datetime(latest_at),
+                },
+            },
+        })
+    return chain
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction
+from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction, PredictionJob
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -10,11 +10,18 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
-    profile = UserProfileSerializer(read_only=True)
+    profile = UserProfileSerializer(source='userprofile', read_only=True)
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
+    
+    # Each serializer that nests others lists the relations it reads, so views
+    # can load them with the rows (setup_eager_loading) instead of one query
+    # per row per relation. Keep these in step with the nested fields.
+    @staticmethod
+    def related_fields(prefix):
+        return [f'{prefix}__userprofile']
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -31,6 +38,19 @@ class SupplyChainItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = SupplyChainItem
         fields = ['id', 'product', 'farmer', 'current_holder', 'quantity', 'status', 'location', 'created_at', 'updated_at']
+    
+    @staticmethod
+    def related_fields(prefix=''):
+        prefix = f'{prefix}__' if prefix else ''
+        return [
+            f'{prefix}product',
+            *UserSerializer.related_fields(f'{prefix}farmer'),
+            *UserSerializer.related_fields(f'{prefix}current_holder'),
+        ]
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related(*cls.related_fields())
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -41,94 +61,55 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ['id', 'from_user', 'to_user', 'supply_chain_item', 'transaction_type', 'amount', 'quantity', 'created_at']
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related(
+            *UserSerializer.related_fields('from_user'),
+            *UserSerializer.related_fields('to_user'),
+            *SupplyChainItemSerializer.related_fields('supply_chain_item'),
+        )
 
 
 class CropQualityPredictionSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
     
     class Meta:
         model = CropQualityPrediction
-        fields = ['id', 'user', 'image', 'image_url', 'predicted_quality', 'quality_score', 'prediction_confidence', 'created_at']
+        fields = [
+            'id', 'user', 'image', 'image_url', 'thumbnail_url', 'medium_url',
+            'predicted_quality', 'quality_score', 'prediction_confidence', 'created_at'
+        ]
         read_only_fields = ['predicted_quality', 'quality_score', 'prediction_confidence']
     
-    def get_image_url(self, obj):
-        if obj.image:
+    @staticmethod
+    def related_fields(prefix=''):
+        return UserSerializer.related_fields(f'{prefix}__user' if prefix else 'user')
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related(*cls.related_fields())
+    
+    def _file_url(self, file):
+        if file:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
+                return request.build_absolute_uri(file.url)
+            return file.url
         return None
-
-
-class CropQualityPredictionCreateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CropQualityPrediction
-        fields = ['image']
     
-    def create(self, validated_data):
-        # The prediction logic will be handled in the view
-        return super().create(validated_data)
-from django.contrib.auth.models import User
-from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction
-
-
-class UserProfileSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = UserProfile
-        fields = ['user_type', 'phone_number', 'address', 'created_at', 'updated_at']
-
-
-class UserSerializer(serializers.ModelSerializer):
-    profile = UserProfileSerializer(read_only=True)
-    
-    class Meta:
-        model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
-
-
-class ProductSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Product
-        fields = ['id', 'name', 'description', 'category', 'unit', 'created_at', 'updated_at']
-
-
-class SupplyChainItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
-    farmer = UserSerializer(read_only=True)
-    current_holder = UserSerializer(read_only=True)
+    def get_image_url(self, obj):
+        return self._file_url(obj.image)
     
-    class Meta:
-        model = SupplyChainItem
-        fields = ['id', 'product', 'farmer', 'current_holder', 'quantity', 'status', 'location', 'created_at', 'updated_at']
-
-
-class TransactionSerializer(serializers.ModelSerializer):
-    from_user = UserSerializer(read_only=True)
-    to_user = UserSerializer(read_only=True)
-    supply_chain_item = SupplyChainItemSerializer(read_only=True)
+    def get_thumbnail_url(self, obj):
+        # Rows stored before derivatives existed fall back to the original
+        return self._file_url(obj.thumbnail or obj.image)
     
-    class Meta:
-        model = Transaction
-        fields = ['id', 'from_user', 'to_user', 'supply_chain_item', 'transaction_type', 'amount', 'quantity', 'created_at']
-
-
-class CropQualityPredictionSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    image_url = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = CropQualityPrediction
-        fields = ['id', 'user', 'image', 'image_url', 'predicted_quality', 'quality_score', 'prediction_confidence', 'created_at']
-        read_only_fields = ['predicted_quality', 'quality_score', 'prediction_confidence']
-    
-    def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+    def get_medium_url(self, obj):
+        return self._file_url(obj.medium or obj.image)
 
 
 class CropQualityPredictionCreateSerializer(serializers.ModelSerializer):
@@ -139,76 +120,15 @@ class CropQualityPredictionCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # The prediction logic will be handled in the view
         return super().create(validated_data)
-from django.contrib.auth.models import User
-from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction
-
 
-class UserProfileSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = UserProfile
-        fields = ['user_type', 'phone_number', 'address', 'created_at', 'updated_at']
 
-
-class UserSerializer(serializers.ModelSerializer):
-    profile = UserProfileSerializer(read_only=True)
+class PredictionJobSerializer(serializers.ModelSerializer):
+    prediction = CropQualityPredictionSerializer(read_only=True)
     
     class Meta:
-        model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
-
-
-class ProductSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Product
-        fields = ['id', 'name', 'description', 'category', 'unit', 'created_at', 'updated_at']
-
-
-class SupplyChainItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
-    farmer = UserSerializer(read_only=True)
-    current_holder = UserSerializer(read_only=True)
+        model = PredictionJob
+        fields = ['id', 'status', 'attempts', 'error', 'prediction', 'created_at', 'finished_at']
     
-    class Meta:
-        model = SupplyChainItem
-        fields = ['id', 'product', 'farmer', 'current_holder', 'quantity', 'status', 'location', 'created_at', 'updated_at']
-
-
-class TransactionSerializer(serializers.ModelSerializer):
-    from_user = UserSerializer(read_only=True)
-    to_user = UserSerializer(read_only=True)
-    supply_chain_item = SupplyChainItemSerializer(read_only=True)
-    
-    class Meta:
-        model = Transaction
-        fields = ['id', 'from_user', 'to_user', 'supply_chain_item', 'transaction_type', 'amount', 'quantity', 'created_at']
-
-
-class CropQualityPredictionSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    image_url = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = CropQualityPrediction
-        fields = ['id', 'user', 'image', 'image_url', 'predicted_quality', 'quality_score', 'prediction_confidence', 'created_at']
-        read_only_fields = ['predicted_quality', 'quality_score', 'prediction_confidence']
-    
-    def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
-
-
-class CropQualityPredictionCreateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CropQualityPrediction
-        fields = ['image']
-    
-    def create(self, validated_data):
-        # The prediction logic will be handled in the view
-        return super().create(validated_data)
-
-
-
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related(*CropQualityPredictionSerializer.related_fields('prediction'))
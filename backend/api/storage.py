@@ -0,0 +1,212 @@
+"""Content-addressed storage for crop images and their derivatives.
+
+Files are stored under the SHA-256 of their bytes, sharded two levels deep:
+
+    crop_images/3f/a2/3fa2...c9.jpg
+
+so identical photos are stored once and no directory grows past a few
+thousand entries. Writes go to a temporary file that is fsynced and then
+renamed into place, so readers never see a partial file.
+
+Because one file can back many rows, each database row referencing a file
+holds one reference, counted in StoredBlob. Rows take references when they
+are created (post_save, or retain_files() after bulk_create) and release
+them when deleted (post_delete). A file is removed once the transaction
+releasing its last reference commits. `python manage.py rebuild_storage_refs`
+recomputes the counts from the database and can remove unreferenced files.
+
+A save that finds its file already stored holds no reference until its row
+is written, so a release() in between can remove the file. Such a save
+keeps its verified copy in .incoming as a spare; retain() counts the
+reference first and then puts a spare back if the file is gone.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.functional import LazyObject
+import logging
+
+logger = logging.getLogger(__name__)
+
+INCOMING_DIR = '.incoming'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and dedupes them"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen by _save from the content, and an existing
+        # file with that name already holds the same bytes
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        incoming = os.path.join(self.location, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=incoming, suffix=extension)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            content_hash = digest.hexdigest()
+            final_name = posixpath.join(directory, content_hash[:2], content_hash[2:4], content_hash + extension)
+            full_path = self.path(final_name)
+            if os.path.exists(full_path):
+                # Kept until retain() has counted a reference (see _settle)
+                os.replace(tmp_path, self._spare_prefix(final_name) + os.path.basename(tmp_path))
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                # Atomic on POSIX: the file appears complete or not at all
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return final_name
+
+    def _spare_prefix(self, name):
+        return os.path.join(self.location, INCOMING_DIR, posixpath.basename(name) + '.')
+
+    def _settle(self, name):
+        """With a reference to name counted, make sure its file exists and drop spare copies"""
+        full_path = self.path(name)
+        prefix = self._spare_prefix(name)
+        incoming, spare_start = os.path.split(prefix)
+        try:
+            spares = [os.path.join(incoming, f) for f in os.listdir(incoming) if f.startswith(spare_start)]
+        except FileNotFoundError:
+            spares = []
+        for spare in spares:
+            try:
+                if os.path.exists(full_path):
+                    os.unlink(spare)
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(spare, full_path)
+                    logger.warning(f"{name} was removed while being saved again; restored it")
+            except FileNotFoundError:
+                # Another retain() of the same name used or dropped this spare
+                pass
+        if not os.path.exists(full_path):
+            logger.error(f"Referenced file {name} is missing from storage")
+
+    def retain(self, names):
+        """Add one reference per occurrence of each name"""
+        from .models import StoredBlob
+
+        for name, count in Counter(n for n in names if n).items():
+            if not StoredBlob.objects.filter(name=name).update(refs=F('refs') + count):
+                try:
+                    with transaction.atomic():
+                        StoredBlob.objects.create(name=name, refs=count)
+                except IntegrityError:
+                    StoredBlob.objects.filter(name=name).update(refs=F('refs') + count)
+            # The update waits for a release() holding the row, and no later
+            # release() can drop the last reference while this one is counted
+            self._settle(name)
+
+    def release(self, name):
+        """Drop one reference; the file is removed with its last reference"""
+        from .models import StoredBlob
+
+        if not name:
+            return
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Stored before reference counting (or never retained): keep it
+                logger.warning(f"Releasing untracked file {name}; left in place")
+                return
+            if blob.refs > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refs=F('refs') - 1)
+                return
+            blob.delete()
+            self._unlink_on_commit(name)
+
+    def delete(self, name):
+        """Remove a file only if no row references it (e.g. after a failed insert)"""
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            if StoredBlob.objects.select_for_update().filter(name=name, refs__gt=0).exists():
+                return
+            StoredBlob.objects.filter(name=name).delete()
+            self._unlink_on_commit(name)
+
+    def _unlink_on_commit(self, name):
+        # The caller's transaction (often an outer one, e.g. a cascade delete)
+        # may still roll back and bring the reference back: unlink only once
+        # it has committed
+        transaction.on_commit(lambda: self._unlink_unreferenced(name))
+
+    def _unlink_unreferenced(self, name):
+        from .models import StoredBlob
+
+        with transaction.atomic():
+            # A retain() since the release re-created the row: keep the file
+            if StoredBlob.objects.select_for_update().filter(name=name).exists():
+                return
+            # A concurrent save of the same bytes may still have found the
+            # file; it kept a spare, which its retain() puts back
+            super().delete(name)
+
+
+class _CropImageStorage(LazyObject):
+    def _setup(self):
+        if getattr(settings, 'CROP_CONTENT_ADDRESSED_STORAGE', True):
+            self._wrapped = ContentAddressedStorage()
+        else:
+            self._wrapped = default_storage
+
+
+crop_image_storage = _CropImageStorage()
+
+
+def get_crop_image_storage():
+    """Storage for crop image fields (callable so migrations don't pin it)"""
+    return crop_image_storage
+
+
+def _content_addressed():
+    # LazyObject proxies __class__, so this sees the wrapped storage
+    return isinstance(crop_image_storage, ContentAddressedStorage)
+
+
+def retain_files(instances, fields=('image', 'thumbnail', 'medium')):
+    """Take references for rows inserted without post_save (bulk_create/bulk_update)"""
+    if not _content_addressed():
+        return
+    crop_image_storage.retain(
+        getattr(instance, field).name
+        for instance in instances
+        for field in fields
+        if hasattr(instance, field) and getattr(instance, field)
+    )
+
+
+def retain_instance_files(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        retain_files([instance])
+
+
+def release_instance_files(sender, instance, **kwargs):
+    if not _content_addressed():
+        return
+    for field in ('image', 'thumbnail', 'medium'):
+        file = getattr(instance, field, None)
+        if file:
+            crop_image_storage.release(file.name)
@@ -0,0 +1,247 @@
+"""Bulk ingestion of supply chain events sent as NDJSON.
+
+Each line of the body is one JSON event:
+
+- ``{"type": "status", "item": 12, "status": "shipped", "holder": 7, "location": "Pune"}``
+  moves an item on; ``holder`` and ``location`` are optional.
+- ``{"type": "transaction", "item": 12, "from_user": 3, "to_user": 7,
+  "transaction_type": "sale", "amount": "1250.00", "quantity": "40"}``
+  records a transaction.
+
+An optional ``ref`` is echoed back with any error for that line. Lines are
+processed in chunks: each chunk is parsed and checked field by field, its
+items and users are resolved with one query each, and its changes are
+written with one bulk_update and one bulk_create in a single transaction.
+A bad line is reported with its line number and skipped; it never aborts
+the rest of the upload. A chunk whose write fails is reported line by line
+and the next chunk carries on. Past the size limit processing stops, and
+``stopped_at_line`` tells the client where to resume.
+
+Users may change items they farmed or hold, and record transactions that
+hand on items they hold (the sender must be the item's current holder, or
+its farmer when it has none). Staff (aggregators pushing for others) may
+change any item and record transactions for any sender, but the sender
+must still hold the item.
+"""
+from decimal import Decimal, InvalidOperation
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import MAX_ID, SupplyChainItem, Transaction
+
+logger = logging.getLogger(__name__)
+
+STATUSES = {key for key, _ in SupplyChainItem.STATUS_CHOICES}
+TRANSACTION_TYPES = {key for key, _ in Transaction.TRANSACTION_TYPES}
+LOCATION_MAX_LENGTH = SupplyChainItem._meta.get_field('location').max_length
+# DecimalField(max_digits=10, decimal_places=2)
+MAX_DECIMAL = Decimal('99999999.99')
+
+
+def _decimal(value, name, errors, positive=False):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        errors[name] = 'Expected a decimal number'
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        errors[name] = 'Expected a decimal number'
+        return None
+    if not number.is_finite() or number.as_tuple().exponent < -2:
+        errors[name] = 'At most 2 decimal places'
+    elif number < 0 or (positive and number == 0) or number > MAX_DECIMAL:
+        errors[name] = f"Must be {'above' if positive else 'at least'} 0 and at most {MAX_DECIMAL}"
+    else:
+        return number
+    return None
+
+
+def _id(value, name, errors, required=True):
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_ID:
+        errors[name] = f"Expected a positive integer id of at most {MAX_ID}"
+        return None
+    return value
+
+
+def _check_event(event):
+    """Field checks that need no database; returns (cleaned event, errors)"""
+    errors = {}
+    kind = event.get('type')
+    if kind == 'status':
+        cleaned = {
+            'type': kind,
+            'item': _id(event.get('item'), 'item', errors),
+            'holder': _id(event.get('holder'), 'holder', errors, required=False),
+            'status': event.get('status'),
+            'location': event.get('location'),
+        }
+        if cleaned['status'] not in STATUSES:
+            errors['status'] = f"Expected one of {', '.join(sorted(STATUSES))}"
+        location = cleaned['location']
+        if location is not None and (not isinstance(location, str) or len(location) > LOCATION_MAX_LENGTH):
+            errors['location'] = f"Expected a string of at most {LOCATION_MAX_LENGTH} characters"
+    elif kind == 'transaction':
+        cleaned = {
+            'type': kind,
+            'item': _id(event.get('item'), 'item', errors),
+            'from_user': _id(event.get('from_user'), 'from_user', errors),
+            'to_user': _id(event.get('to_user'), 'to_user', errors),
+            'transaction_type': event.get('transaction_type'),
+            'amount': _decimal(event.get('amount'), 'amount', errors),
+            'quantity': _decimal(event.get('quantity'), 'quantity', errors, positive=True),
+        }
+        if cleaned['transaction_type'] not in TRANSACTION_TYPES:
+            errors['transaction_type'] = f"Expected one of {', '.join(sorted(TRANSACTION_TYPES))}"
+    else:
+        return None, {'type': 'Expected "status" or "transaction"'}
+    return cleaned, errors
+
+
+def _parse_chunk(lines, results):
+    """Parse and field-check one chunk; returns [(line number, ref, cleaned event)]"""
+    parsed = []
+    for number, line in lines:
+        try:
+            event = json.loads(line)
+        except (ValueError, UnicodeDecodeError) as e:
+            results.fail(number, None, {'line': f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(event, dict):
+            results.fail(number, None, {'line': 'Expected a JSON object'})
+            continue
+        ref = event.get('ref')
+        cleaned, errors = _check_event(event)
+        if errors:
+            results.fail(number, ref, errors)
+        else:
+            parsed.append((number, ref, cleaned))
+    return parsed
+
+
+class IngestResults:
+    """Counts and per-line errors of one upload (errors beyond max_errors are only counted)"""
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.received = 0
+        self.applied = {'status': 0, 'transaction': 0}
+        self.failed = 0
+        self.errors = []
+        # Line number where processing stopped at the upload size limit
+        self.stopped_at_line = None
+
+    def fail(self, line, ref, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, **({'ref': ref} if ref is not None else {}), 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            'applied': self.applied,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'stopped_at_line': self.stopped_at_line,
+        }
+
+
+def _apply_chunk(parsed, user, results):
+    """Resolve, authorize and write one chunk of field-checked events"""
+    item_ids = {event['item'] for _, _, event in parsed}
+    user_ids = {
+        event[key] for _, _, event in parsed
+        for key in ('holder', 'from_user', 'to_user') if event.get(key) is not None
+    }
+    # One lookup per chunk for each foreign key
+    items = SupplyChainItem.objects.in_bulk(item_ids)
+    known_users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+    now = timezone.now()
+    changed, created, applied = {}, [], []
+    for number, ref, event in parsed:
+        item = items.get(event['item'])
+        errors = {}
+        if item is None:
+            errors['item'] = 'No such supply chain item'
+        for key in ('holder', 'from_user', 'to_user'):
+            if event.get(key) is not None and event[key] not in known_users:
+                errors[key] = 'No such user'
+        if errors:
+            results.fail(number, ref, errors)
+            continue
+
+        if event['type'] == 'status':
+            # Checked against the item as earlier lines of the upload left it
+            if not user.is_staff and user.id not in (item.farmer_id, item.current_holder_id):
+                results.fail(number, ref, {'item': 'You neither farmed nor hold this item'})
+                continue
+            item.status = event['status']
+            if event['holder'] is not None:
+                item.current_holder_id = event['holder']
+            if event['location'] is not None:
+                item.location = event['location']
+            item.updated_at = now
+            changed[item.id] = item
+        else:
+            if not user.is_staff and event['from_user'] != user.id:
+                results.fail(number, ref, {'from_user': 'You can only record transactions you send'})
+                continue
+            # Only the custodian can hand the item on, as the item stands
+            # after earlier lines of the upload
+            if event['from_user'] != (item.current_holder_id or item.farmer_id):
+                results.fail(number, ref, {'from_user': 'The sender does not hold this item'})
+                continue
+            created.append(Transaction(
+                from_user_id=event['from_user'], to_user_id=event['to_user'], supply_chain_item_id=item.id,
+                transaction_type=event['transaction_type'], amount=event['amount'], quantity=event['quantity'],
+            ))
+        applied.append((number, ref, event['type']))
+
+    try:
+        with transaction.atomic():
+            # bulk_update skips auto_now; updated_at was set above
+            SupplyChainItem.objects.bulk_update(
+                list(changed.values()), ['status', 'current_holder', 'location', 'updated_at']
+            )
+            Transaction.objects.bulk_create(created)
+    except DatabaseError as e:
+        # e.g. an item or user deleted since it was resolved: the whole
+        # chunk is rolled back, later chunks still go in
+        logger.warning(f"Supply chain ingest chunk failed: {str(e)}")
+        for number, ref, _ in applied:
+            results.fail(number, ref, {'line': 'Not saved: the chunk it was in failed to write'})
+        return
+    for _, _, kind in applied:
+        results.applied[kind] += 1
+
+
+def ingest_events(lines, user, chunk_size=None, max_records=None, max_errors=None):
+    """Apply NDJSON events from an iterable of lines (bytes or str); returns an IngestResults"""
+    chunk_size = chunk_size or getattr(settings, 'SUPPLY_CHAIN_INGEST_CHUNK_SIZE', 1000)
+    max_records = max_records or getattr(settings, 'SUPPLY_CHAIN_INGEST_MAX_RECORDS', 50000)
+    results = IngestResults(max_errors or getattr(settings, 'SUPPLY_CHAIN_INGEST_MAX_ERRORS', 1000))
+
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        if results.received >= max_records:
+            # Everything before this line is applied; say where to resume
+            results.stopped_at_line = number
+            break
+        results.received += 1
+        chunk.append((number, line))
+        if len(chunk) >= chunk_size:
+            _apply_chunk(_parse_chunk(chunk, results), user, results)
+            chunk = []
+    if chunk:
+        _apply_chunk(_parse_chunk(chunk, results), user, results)
+    return results
@@ -0,0 +1,149 @@
+"""Per-stage latency instrumentation for the crop prediction pipeline.
+
+Code on the prediction path wraps each stage in ``stage('decode')`` and so
+on. Every stage duration goes into a per-process histogram (reported by
+``/api/metrics/``). Inside ``timed_request()`` it is also added to that
+request's StageTimer, which the view logs and can return as a
+``Server-Timing`` header. The current timer is held in a context variable,
+so the ml_utils helpers don't need it passed through their signatures.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_current_timer = contextvars.ContextVar('crop_stage_timer', default=None)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        index = len(self.BUCKETS_MS)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th quantile (max for the overflow bucket)"""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, round(self.max_ms, 3))
+        return round(self.max_ms, 3)
+
+    def stats(self):
+        labels = [f"le_{bound:g}" for bound in self.BUCKETS_MS] + ['le_inf']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3) if self.count else None,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class PipelineMetrics:
+    """Stage histograms and event counters for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = Counter()
+
+    def observe(self, stage_name, ms):
+        with self._lock:
+            histogram = self._histograms.get(stage_name)
+            if histogram is None:
+                histogram = self._histograms[stage_name] = LatencyHistogram()
+            histogram.observe(ms)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return {
+                'stages': {name: histogram.stats() for name, histogram in sorted(self._histograms.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+class StageTimer:
+    """Stage durations of one request, in the order they first ran"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+
+    def add(self, stage_name, ms):
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + ms
+
+    @property
+    def total_ms(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return (end - self.started) * 1000.0
+
+    def summary(self):
+        return {
+            'total_ms': round(self.total_ms, 3),
+            'stages_ms': {name: round(ms, 3) for name, ms in self.stages.items()},
+        }
+
+    def server_timing(self):
+        """Value for a ``Server-Timing`` response header (shown by browser dev tools)"""
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        entries.append(f"total;dur={self.total_ms:.1f}")
+        return ', '.join(entries)
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage into the histograms and the current request's timer"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - started) * 1000.0
+        pipeline_metrics.observe(name, ms)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.add(name, ms)
+
+
+@contextmanager
+def timed_request():
+    """Collect the stages run inside the block into a new StageTimer"""
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        timer.finished = time.perf_counter()
+        _current_timer.reset(token)
+        pipeline_metrics.observe('total', timer.total_ms)
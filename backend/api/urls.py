@@ -5,27 +5,23 @@ from . import views
 # Create a router for ViewSets
 router = DefaultRouter()
 router.register(r'crop-prediction', views.CropQualityPredictionViewSet, basename='crop-prediction')
+router.register(r'supply-chain-items', views.SupplyChainItemViewSet, basename='supply-chain-item')
+router.register(r'transactions', views.TransactionViewSet, basename='transaction')
 
 urlpatterns = [
     path('health/', views.health_check, name='health_check'),
     path('info/', views.api_info, name='api_info'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('predict/', views.predict_price, name='predict_price'),
+    path('price-board/', views.price_board_lookup, name='price_board_lookup'),
     path('predict-crop/', views.predict_crop_quality, name='predict_crop_quality'),
+    path('predict-crop/bulk/', views.predict_crop_quality_bulk, name='predict_crop_quality_bulk'),
+    path('predict-crop/jobs/', views.submit_prediction_job, name='submit_prediction_job'),
+    path('predict-crop/jobs/<int:job_id>/', views.prediction_job_status, name='prediction_job_status'),
+    path('predict-crop/jobs/<int:job_id>/events/', views.prediction_job_events, name='prediction_job_events'),
     path('my-predictions/', views.get_user_predictions, name='get_user_predictions'),
-    path('', include(router.urls)),
-]
-
-urlpatterns = [
-    path('health/', views.health_check, name='health_check'),
-    path('info/', views.api_info, name='api_info'),
-    path('predict-crop/', views.predict_crop_quality, name='predict_crop_quality'),
-    path('my-predictions/', views.get_user_predictions, name='get_user_predictions'),
-    path('', include(router.urls)),
-]
-
-urlpatterns = [
-    path('health/', views.health_check, name='health_check'),
-    path('info/', views.api_info, name='api_info'),
-    path('predict-crop/', views.predict_crop_quality, name='predict_crop_quality'),
-    path('my-predictions/', views.get_user_predictions, name='get_user_predictions'),
+    path('my-predictions/stats/', views.prediction_stats, name='prediction_stats'),
+    path('supply-chain/ingest/', views.ingest_supply_chain_events, name='ingest_supply_chain_events'),
+    path('supply-chain-items/<int:item_id>/provenance/', views.supply_chain_item_provenance, name='supply_chain_item_provenance'),
     path('', include(router.urls)),
 ]
@@ -1,19 +1,44 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import AllowAny, BasePermission, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import JsonResponse
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from .models import UserProfile, Product, SupplyChainItem, Transaction, CropQualityPrediction, PredictionJob
 from .serializers import (
     UserProfileSerializer, UserSerializer, ProductSerializer, 
     SupplyChainItemSerializer, TransactionSerializer, 
-    CropQualityPredictionSerializer, CropQualityPredictionCreateSerializer
+    CropQualityPredictionSerializer, CropQualityPredictionCreateSerializer,
+    PredictionJobSerializer
 )
-from .ml_utils import predictor
+from .ml_utils import MOCK_MODEL_VERSION, predictor
+from .fast_lists import fast_lists_enabled, paginated_prediction_response
+from .filters import filter_supply_chain_items, filter_transactions
+from .pagination import KeysetPagination, UpdatedKeysetPagination
+from .prediction_cache import prediction_cache, predict_upload, predict_upload_tiled
+from .prediction_jobs import events_token, events_token_user_id, submit_job
+from .prediction_stats import user_stats
+from .provenance import item_provenance
+from .supply_chain_ingest import ingest_events
+from .bulk_predictions import BulkUploadError, predict_lot, summarize_lot
+from .price_board import load_price_board, lookup_price
+from .pricing import estimate_price_async
+from .timing import pipeline_metrics, stage, timed_request
+import asyncio
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +46,24 @@ logger = logging.getLogger(__name__)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
-    """Health check endpoint"""
+    """Health check endpoint.
+
+    With ``?ready=1`` it is a readiness probe: it starts loading the model if
+    nothing has yet and answers 503 until the model is loaded and warm.
+    """
+    if request.query_params.get('ready'):
+        predictor.start_loading()
+    model = predictor.readiness()
+    if request.query_params.get('ready') and not model['ready']:
+        return Response({
+            'status': 'starting',
+            'message': 'Crop quality model is not ready yet',
+            'model': model,
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     return Response({
         'status': 'healthy',
-        'message': 'Django backend is running successfully!'
+        'message': 'Django backend is running successfully!',
+        'model': model,
     })
 
 
@@ -41,16 +80,122 @@ def api_info(request):
             'info': '/api/info/',
             'admin': '/admin/',
             'crop-prediction': '/api/crop-prediction/',
+            'price-board': '/api/price-board/',
+            'predict-price': '/api/predict/',
+            'predict-crop-jobs': '/api/predict-crop/jobs/',
+            'predict-crop-bulk': '/api/predict-crop/bulk/',
+            'metrics': '/api/metrics/',
+            'supply-chain-items': '/api/supply-chain-items/',
+            'transactions': '/api/transactions/',
+            'prediction-stats': '/api/my-predictions/stats/',
+            'supply-chain-ingest': '/api/supply-chain/ingest/',
+            'provenance': '/api/supply-chain-items/<id>/provenance/',
         }
     })
 
 
+class IsStaffOrMetricsToken(BasePermission):
+    """Staff users, or scrapers sending ``Authorization: Bearer <CROP_METRICS_TOKEN>``"""
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, 'CROP_METRICS_TOKEN', '')
+        return bool(token) and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+@api_view(['GET'])
+@permission_classes([IsStaffOrMetricsToken])
+def metrics(request):
+    """Per-process inference metrics (batch sizes, queue wait, stage latencies); staff or metrics token only"""
+    return Response({
+        'pid': os.getpid(),
+        'crop_quality': predictor.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'crop_pipeline': pipeline_metrics.stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def price_board_lookup(request):
+    """Look up today's precomputed per-kg price of a commodity in a state"""
+    commodity = request.query_params.get('commodity', '').strip()
+    state = request.query_params.get('state', '').strip() or None
+    if not commodity:
+        return Response(
+            {'error': 'commodity is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    board = load_price_board()
+    if board is None:
+        return Response(
+            {'error': 'Price board has not been built yet'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    price_per_kg = lookup_price(board, commodity, state)
+    if price_per_kg is None:
+        return Response(
+            {'error': f'No price available for {commodity}' + (f' in {state}' if state else '')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response({
+        'commodity': commodity,
+        'state': state,
+        'price_per_kg': price_per_kg,
+        # The state had no price of its own, so this is the all-India one
+        'all_india_fallback': bool(state) and lookup_price(board, commodity, state, fallback=False) is None,
+        'currency': board.get('currency', 'INR'),
+        'generated_at': board.get('generated_at'),
+    })
+
+
+@csrf_exempt
+@require_POST
+async def predict_price(request):
+    """Estimate the market price of a crop at a location.
+
+    Async so that the geocoding and weather requests don't hold a worker
+    thread; serve through the ASGI app to get the benefit (README_DEPLOY.md).
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+        crop = str(payload.get('crop') or '').strip()
+        kilograms = float(payload.get('kilograms', 1))
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+    location = str(payload.get('location') or '').strip()
+    offline = str(payload.get('offline', '')).lower() in ('1', 'true', 'yes')
+    if not crop or kilograms <= 0 or not (location or offline):
+        return JsonResponse(
+            {'error': 'crop, a positive kilograms value and location are required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        estimate = await estimate_price_async(crop, kilograms, location, offline=offline)
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Price dataset is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error estimating price: {str(e)}")
+        return JsonResponse({'error': 'Failed to estimate price'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    return JsonResponse(estimate)
+
+
 class CropQualityPredictionViewSet(ModelViewSet):
     """ViewSet for crop quality prediction"""
-    queryset = CropQualityPrediction.objects.all()
+    queryset = CropQualityPredictionSerializer.setup_eager_loading(CropQualityPrediction.objects.all())
     serializer_class = CropQualityPredictionSerializer
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -59,41 +204,193 @@ class CropQualityPredictionViewSet(ModelViewSet):
     
     def perform_create(self, serializer):
         """Create a new crop quality prediction"""
-        try:
-            # Save the instance first to get the image path
-            instance = serializer.save(user=self.request.user)
-            
-            # Make prediction using the ML model
-            prediction_result = predictor.predict_quality(instance.image.path)
-            
-            # Update the instance with prediction results
-            instance.predicted_quality = prediction_result['quality_label']
-            instance.quality_score = prediction_result['quality_score']
-            instance.prediction_confidence = prediction_result['confidence']
-            instance.save()
-            
-            logger.info(f"Prediction completed for user {self.request.user.username}: {prediction_result}")
-            
-        except Exception as e:
-            logger.error(f"Error in crop quality prediction: {str(e)}")
-            # If prediction fails, set default values
-            instance.predicted_quality = 'bad'
-            instance.quality_score = 0.0
-            instance.prediction_confidence = 0.0
-            instance.save()
-            raise
+        # Predict from the uploaded file before anything is persisted, so the
+        # row is inserted once with its results and the image is never re-read
+        # from disk. Re-uploads of identical bytes reuse the stored result.
+        fields, cached = predict_upload(serializer.validated_data['image'])
+        serializer.save(user=self.request.user, **fields)
+        logger.info(
+            f"Prediction completed for user {self.request.user.username}: "
+            f"{fields['predicted_quality']} ({fields['quality_score']:.3f}, cached={cached})"
+        )
     
     def list(self, request, *args, **kwargs):
-        """List predictions for the authenticated user"""
+        """List predictions for the authenticated user, newest first, one page per request"""
         queryset = self.queryset.filter(user=request.user)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        if fast_lists_enabled():
+            return paginated_prediction_response(queryset, self.paginator, request)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class SupplyChainItemViewSet(ReadOnlyModelViewSet):
+    """Supply chain items the user farmed or holds, most recently changed first.
+
+    Filters: ``holder``, ``farmer`` (user id or ``me``), ``status``,
+    ``product``, ``updated_after`` and ``updated_before``.
+    """
+    serializer_class = SupplyChainItemSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = UpdatedKeysetPagination
+    
+    def get_queryset(self):
+        queryset = SupplyChainItemSerializer.setup_eager_loading(SupplyChainItem.objects.all())
+        return filter_supply_chain_items(queryset, self.request.query_params, self.request.user)
+
+
+class TransactionViewSet(ReadOnlyModelViewSet):
+    """Transactions the user sent or received, newest first.
+
+    Filters: ``direction`` (``sent`` or ``received``), ``type``, ``item``,
+    ``product``, ``created_after`` and ``created_before``.
+    """
+    serializer_class = TransactionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        queryset = TransactionSerializer.setup_eager_loading(Transaction.objects.all())
+        return filter_transactions(queryset, self.request.query_params, self.request.user)
+
+
+def _save_prediction(user, fields):
+    # What Model.save() does for uncommitted files, split out so the disk
+    # write and the insert are timed separately
+    prediction = CropQualityPrediction(user=user, **fields)
+    with stage('disk_write'):
+        for field in ('image', 'thumbnail', 'medium'):
+            file = getattr(prediction, field)
+            if file and not file._committed:
+                file.save(file.name, file.file, save=False)
+    with stage('db_save'):
+        prediction.save()
+    return prediction
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def predict_crop_quality(request):
-    """Simple endpoint for crop quality prediction"""
+    """Simple endpoint for crop quality prediction.
+
+    With ``mode=tiled`` (form field or query parameter) large field photos
+    are scored as overlapping 200x200 tiles in one batch, and the response
+    adds a ``tiles`` heatmap (see CropQualityPredictor.predict_tiled).
+
+    Each stage is timed into the /api/metrics/ histograms and logged as one
+    ``crop_prediction`` JSON line; with CROP_PREDICTION_TIMING_HEADER the
+    timings are also returned in a ``Server-Timing`` header.
+    """
+    record = {'user': request.user.username}
+    with timed_request() as timer:
+        # Multipart bodies are parsed on first access
+        with stage('upload'):
+            image = request.FILES.get('image')
+        mode = request.data.get('mode') or request.query_params.get('mode') or 'whole'
+        record['mode'] = mode
+        if image is None:
+            response = Response(
+                {'error': 'No image file provided'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        elif mode not in ('whole', 'tiled'):
+            response = Response(
+                {'error': "mode must be 'whole' or 'tiled'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        else:
+            try:
+                record['bytes'] = image.size
+
+                tiles = None
+                if mode == 'tiled':
+                    fields, tiles = predict_upload_tiled(image)
+                    cached = False
+                else:
+                    # Predict straight from the in-memory/temporary upload, or reuse the
+                    # stored prediction and file if these exact bytes were seen before
+                    fields, cached = predict_upload(image)
+
+                # Store the image and the results in a single insert
+                prediction = _save_prediction(request.user, fields)
+                record.update(
+                    prediction_id=prediction.id,
+                    cached=cached,
+                    quality=prediction.predicted_quality,
+                    model_version=prediction.model_version,
+                    mock_fallback=prediction.model_version == MOCK_MODEL_VERSION,
+                )
+                
+                # Return the result
+                with stage('serialize'):
+                    data = CropQualityPredictionSerializer(prediction, context={'request': request}).data
+                if mode == 'tiled':
+                    data['tiles'] = tiles
+                response = Response(data, status=status.HTTP_201_CREATED)
+                
+            except Exception as e:
+                logger.error(f"Error in crop quality prediction: {str(e)}")
+                response = Response(
+                    {'error': 'Failed to process image prediction'}, 
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+    record['status'] = response.status_code
+    record.update(timer.summary())
+    logger.info(f"crop_prediction {json.dumps(record)}")
+    if settings.CROP_PREDICTION_TIMING_HEADER:
+        response['Server-Timing'] = timer.server_timing()
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def predict_crop_quality_bulk(request):
+    """Predict a whole lot of crop images sent as `images` files and/or `archive` ZIPs"""
+    files = request.FILES.getlist('images')
+    archives = request.FILES.getlist('archive')
+    if not files and not archives:
+        return Response(
+            {'error': 'Provide images or a ZIP archive'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        items, predictions = predict_lot(request.user, files, archives)
+    except BulkUploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in bulk crop quality prediction: {str(e)}")
+        return Response(
+            {'error': 'Failed to process image predictions'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    results = []
+    for name, prediction, error in items:
+        if prediction is None:
+            results.append({'name': name, 'error': error})
+            continue
+        results.append({
+            'name': name,
+            'id': prediction.id,
+            'image_url': request.build_absolute_uri(prediction.image.url),
+            'thumbnail_url': request.build_absolute_uri((prediction.thumbnail or prediction.image).url),
+            'predicted_quality': prediction.predicted_quality,
+            'quality_score': prediction.quality_score,
+            'prediction_confidence': prediction.prediction_confidence,
+        })
+    failed = sum(1 for _, prediction, _ in items if prediction is None)
+    return Response({
+        'lot': summarize_lot(predictions, failed),
+        'results': results,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_prediction_job(request):
+    """Queue a crop quality prediction and return immediately with its job id"""
     if 'image' not in request.FILES:
         return Response(
             {'error': 'No image file provided'}, 
@@ -101,37 +398,176 @@ def predict_crop_quality(request):
         )
     
     try:
-        # Create the prediction instance
-        prediction = CropQualityPrediction.objects.create(
-            user=request.user,
-            image=request.FILES['image']
-        )
-        
-        # Make prediction
-        prediction_result = predictor.predict_quality(prediction.image.path)
-        
-        # Update with prediction results
-        prediction.predicted_quality = prediction_result['quality_label']
-        prediction.quality_score = prediction_result['quality_score']
-        prediction.prediction_confidence = prediction_result['confidence']
-        prediction.save()
-        
-        # Return the result
-        serializer = CropQualityPredictionSerializer(prediction, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-        
+        job = submit_job(request.user, request.FILES['image'])
     except Exception as e:
-        logger.error(f"Error in crop quality prediction: {str(e)}")
+        logger.error(f"Error queueing crop quality prediction: {str(e)}")
         return Response(
-            {'error': 'Failed to process image prediction'}, 
+            {'error': 'Failed to queue image prediction'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+    
+    return Response({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': request.build_absolute_uri(reverse('prediction_job_status', args=[job.id])),
+        'events_url': request.build_absolute_uri(
+            f"{reverse('prediction_job_events', args=[job.id])}?token={events_token(job)}"
+        ),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def prediction_job_status(request, job_id):
+    """Current state of a queued prediction, with the prediction once done"""
+    job = get_object_or_404(
+        PredictionJobSerializer.setup_eager_loading(PredictionJob.objects.all()), pk=job_id, user=request.user
+    )
+    serializer = PredictionJobSerializer(job, context={'request': request})
+    return Response(serializer.data)
+
+
+async def _prediction_job_stream(request, job_id):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.PREDICTION_JOB_EVENTS_TIMEOUT
+    finished = (PredictionJob.STATUS_DONE, PredictionJob.STATUS_FAILED)
+    last_status = None
+    yield 'retry: 2000\n\n'
+    while True:
+        try:
+            job = await PredictionJobSerializer.setup_eager_loading(PredictionJob.objects.all()).aget(pk=job_id)
+        except PredictionJob.DoesNotExist:
+            # Deleted while subscribed: tell the client to stop reconnecting
+            yield f"event: deleted\ndata: {json.dumps({'id': job_id})}\n\n"
+            return
+        if job.status != last_status:
+            data = await sync_to_async(
+                lambda: PredictionJobSerializer(job, context={'request': request}).data
+            )()
+            yield f"event: status\ndata: {json.dumps(data)}\n\n"
+            last_status = job.status
+        if job.status in finished or loop.time() >= deadline:
+            return
+        await asyncio.sleep(settings.PREDICTION_JOB_POLL_INTERVAL)
+
+
+def _api_user_id(request):
+    """Id of the user DRF's authenticators (session or Authorization: Token) find, or None"""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    return user.id if user.is_authenticated else None
+
+
+async def prediction_job_events(request, job_id):
+    """Server-Sent Events stream of a prediction job's status changes.
+
+    Async so that waiting clients don't hold worker threads when served
+    through the ASGI app. The stream ends once the job is done, failed or
+    deleted. EventSource cannot send headers, so besides the API's session
+    and token authentication the stream accepts the signed ``token`` query
+    parameter of the events_url returned on submission.
+    """
+    token = request.GET.get('token')
+    if token:
+        user_id = events_token_user_id(token, job_id)
+    else:
+        user_id = await sync_to_async(_api_user_id)(request)
+    if user_id is None:
+        return JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not await PredictionJob.objects.filter(pk=job_id, user_id=user_id).aexists():
+        return JsonResponse({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(_prediction_job_stream(request, job_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_predictions(request):
-    """Get all predictions for the authenticated user"""
-    predictions = CropQualityPrediction.objects.filter(user=request.user)
-    serializer = CropQualityPredictionSerializer(predictions, many=True, context={'request': request})
-    return Response(serializer.data)
\ No newline at end of file
+    """Get the authenticated user's predictions, newest first, one page per request"""
+    predictions = CropQualityPredictionSerializer.setup_eager_loading(
+        CropQualityPrediction.objects.filter(user=request.user)
+    )
+    paginator = KeysetPagination()
+    if fast_lists_enabled():
+        return paginated_prediction_response(predictions, paginator, request)
+    page = paginator.paginate_queryset(predictions, request)
+    serializer = CropQualityPredictionSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def prediction_stats(request):
+    """Prediction totals and a daily good/bad/average-score series, read from the daily rollups.
+
+    ``days`` (default 30, at most 366) sets the length of the series. Staff
+    may pass ``user`` to see another user's statistics.
+    """
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= days <= 366:
+        return Response({'error': 'days must be between 1 and 366'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_id = request.user.id
+    if 'user' in request.query_params:
+        if not request.user.is_staff:
+            return Response({'error': 'Only staff can view other users'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            user_id = int(request.query_params['user'])
+        except ValueError:
+            return Response({'error': 'user must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(user_stats(user_id, days))
+
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest_supply_chain_events(request):
+    """Apply NDJSON supply chain status changes and transactions in bulk (see api/supply_chain_ingest.py)"""
+    if request.content_type.split(';')[0].strip() not in NDJSON_CONTENT_TYPES:
+        return Response(
+            {'error': f"Send one JSON event per line as {NDJSON_CONTENT_TYPES[0]}"},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+    # Read line by line rather than buffering the whole body
+    stream = request.stream
+    results = ingest_events(stream if stream is not None else [], request.user)
+    if not results.received:
+        return Response({'error': 'No events in the request body'}, status=status.HTTP_400_BAD_REQUEST)
+    logger.info(
+        f"Supply chain ingest by {request.user.username}: {results.received} events, "
+        f"{results.applied['status']} status changes, {results.applied['transaction']} transactions, "
+        f"{results.failed} failed"
+    )
+    return Response(results.as_dict())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def supply_chain_item_provenance(request, item_id):
+    """Ordered custody chain of an item with each hop's transaction and the holder's quality predictions.
+
+    Visible to staff, the farmer and the current holder. Being a party to one
+    of the item's transactions is not enough: rows written before ingestion
+    checked custody may have been forged by their receiver.
+    """
+    item = get_object_or_404(SupplyChainItemSerializer.setup_eager_loading(SupplyChainItem.objects.all()), pk=item_id)
+    # Checked before the chain is walked
+    if not request.user.is_staff and request.user.id not in (item.farmer_id, item.current_holder_id):
+        return Response({'error': 'Only holders of this item can see its provenance'}, status=status.HTTP_403_FORBIDDEN)
+    chain = item_provenance(item.id)
+    return Response({
+        'item': SupplyChainItemSerializer(item).data,
+        'hops': len(chain) - 1,
+        'chain': chain,
+    })
@@ -1,53 +1,48 @@
-from flask import Flask, request, render_template
-import pickle
+"""Crop quality inference sidecar.
+
+Serves the crop model over HTTP with the same preprocessing, precision and
+micro-batching code as the Django app (api/inference_sidecar.py). Run it
+under gunicorn with threaded workers so connections are kept alive and
+concurrent requests share model batches:
+
+    gunicorn --chdir flask-image-upload-2 --preload --worker-class gthread \\
+        --workers 1 --threads 16 --keep-alive 75 \\
+        --bind unix:/run/crop-sidecar/sidecar.sock app:app
+
+and point the web workers at it with CROP_INFERENCE_SIDECAR_URL.
+"""
 import os
-from werkzeug.utils import secure_filename
-from PIL import Image
-import numpy as np
-
-app = Flask(__name__)
-
-# Load the trained model
-model_path = r'C:\Users\HARIHARAN K\Desktop\Crop-Quality-prediction-System-Using-CNN\source_code\crop_quality_model.pkl'
-with open(model_path, 'rb') as f:
-    model = pickle.load(f)
-
-# Set the upload folder
-UPLOAD_FOLDER = 'static/uploads'
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-# Ensure the upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-@app.route('/')
-def upload_form():
-    return render_template('upload.html')
-
-@app.route('/upload', methods=['POST'])
-def upload_image():
-    if 'file' not in request.files:
-        return 'No file part'
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return 'No selected file'
-    
-    if file:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-
-        # Process the image and make a prediction
-        image = Image.open(file_path).convert('RGB')
-        image = image.resize((200, 200))  # Resize to match model input
-        image_array = np.array(image) / 255.0  # Normalize the image
-        image_array = np.expand_dims(image_array, axis=0)  # Add batch dimension
-
-        prediction = model.predict(image_array)
-        quality_score = float(prediction[0][0])  # Assuming model outputs probability for "Good"
-        label = "Good" if quality_score > 0.4 else "Bad"
-        return f'Prediction: {label} | Quality score: {quality_score * 100:.2f}%'
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
+# This process is where the model runs: never forward to a sidecar or pool
+os.environ['CROP_INFERENCE_SIDECAR_URL'] = ''
+os.environ['CROP_INFERENCE_POOL_ADDRESS'] = ''
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.inference_sidecar import InferenceSidecarApp  # noqa: E402
+from api.ml_utils import predictor  # noqa: E402
+
+# Loaded (and warmed up) at import, so with --preload the weights are shared
+# copy-on-write by every gunicorn worker
+predictor.ensure_loaded()
+
+app = InferenceSidecarApp(
+    predictor,
+    max_images=int(os.environ.get('SIDECAR_MAX_IMAGES', '256')),
+    max_body_mb=int(os.environ.get('SIDECAR_MAX_BODY_MB', '256')),
+    decode_threads=int(os.environ.get('SIDECAR_DECODE_THREADS', '4')),
+)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Local testing only; use gunicorn in production
+    from wsgiref.simple_server import make_server
+
+    port = int(os.environ.get('SIDECAR_PORT', '8500'))
+    print(f"Inference sidecar on http://127.0.0.1:{port}")
+    make_server('127.0.0.1', port, app).serve_forever()
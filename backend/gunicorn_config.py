@@ -1,9 +1,18 @@
 # gunicorn_config.py
 # Minimal Gunicorn configuration suitable for simple deployments.
+import os
+
 bind = "0.0.0.0:8000"
 workers = 2
-threads = 2
+# More threads per worker give the crop quality batcher more concurrent
+# requests to coalesce into one model call during upload spikes.
+threads = int(os.environ.get("GUNICORN_THREADS", "2"))
 timeout = 120
 
+# Set GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker and point gunicorn at
+# sih_backend.asgi:application to serve async views (e.g. /api/predict/) on an
+# event loop; `threads` is ignored in that mode. See README_DEPLOY.md.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
 # Preload app for slightly faster worker spawn at the cost of higher memory
 preload_app = True
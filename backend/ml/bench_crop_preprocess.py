@@ -0,0 +1,111 @@
+"""Benchmark crop-quality image preprocessing on 12 MP phone-sized photos.
+
+Compares the reference path (full decode, resize, float64 /255) with the fast
+path (JPEG draft decode, float32 into reused buffers), single-threaded and
+with a thread pool. Photo generation and each mode run in fresh subprocesses
+so peak RSS is comparable (ru_maxrss survives fork and exec).
+
+	python ml/bench_crop_preprocess.py --images 24 --threads 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+
+MODES = ['reference', 'fast', 'fast-threaded']
+
+
+def make_photos(directory, count, size=(4000, 3000)):
+	"""Write `count` synthetic 12 MP JPEGs with phone-like detail and file size."""
+	import numpy as np
+	from PIL import Image
+
+	rng = np.random.default_rng(0)
+	w, h = size
+	yy, xx = np.mgrid[0:h, 0:w]
+	paths = []
+	for i in range(count):
+		base = np.stack([(xx * (i + 1)) % 256, (yy * 3) % 256, (xx + yy) % 256], axis=-1).astype(np.int16)
+		noise = rng.integers(-40, 40, size=(h, w, 3), dtype=np.int16)
+		pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+		path = os.path.join(directory, f'photo_{i:03d}.jpg')
+		Image.fromarray(pixels).save(path, quality=90)
+		paths.append(path)
+	return paths
+
+
+def peak_rss_mb():
+	# ru_maxrss is KiB on Linux
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_mode(mode, paths, threads):
+	os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
+	import django
+	django.setup()
+	import numpy as np
+	from api.ml_utils import predictor, preprocess_batch
+
+	baseline = peak_rss_mb()
+	started = time.perf_counter()
+	if mode == 'reference':
+		for path in paths:
+			predictor.preprocess_image(path)
+	elif mode == 'fast':
+		for path in paths:
+			predictor.preprocess_image_fast(path)
+	else:
+		out = np.empty((threads, 200, 200, 3), dtype=np.float32)
+		for i in range(0, len(paths), threads):
+			chunk = paths[i:i + threads]
+			preprocess_batch(chunk, out=out[:len(chunk)], max_workers=threads)
+	elapsed = time.perf_counter() - started
+	return {
+		'mode': mode,
+		'ms_per_image': round(elapsed * 1000.0 / len(paths), 2),
+		'peak_rss_mb': round(peak_rss_mb(), 1),
+		'peak_rss_delta_mb': round(peak_rss_mb() - baseline, 1),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--images', type=int, default=24)
+	parser.add_argument('--threads', type=int, default=4)
+	parser.add_argument('--mode', choices=MODES + ['generate'], help=argparse.SUPPRESS)
+	parser.add_argument('--dir', help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.mode == 'generate':
+		make_photos(args.dir, args.images)
+		return
+	if args.mode:
+		paths = sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir))
+		print(json.dumps(run_mode(args.mode, paths, args.threads)))
+		return
+
+	with tempfile.TemporaryDirectory() as directory:
+		subprocess.run([sys.executable, __file__, '--mode', 'generate', '--dir', directory, '--images', str(args.images)], check=True)
+		paths = [os.path.join(directory, f) for f in os.listdir(directory)]
+		mb = sum(os.path.getsize(p) for p in paths) / len(paths) / 1e6
+		print(f"{len(paths)} synthetic 4000x3000 JPEGs, {mb:.1f} MB each, {args.threads} threads")
+		print(f"{'mode':<15}{'ms/image':>10}{'peak RSS MB':>14}{'RSS delta MB':>14}")
+		for mode in MODES:
+			out = subprocess.run(
+				[sys.executable, __file__, '--mode', mode, '--dir', directory, '--threads', str(args.threads)],
+				capture_output=True, text=True, check=True, cwd=ROOT,
+			)
+			r = json.loads(out.stdout.strip().splitlines()[-1])
+			print(f"{r['mode']:<15}{r['ms_per_image']:>10}{r['peak_rss_mb']:>14}{r['peak_rss_delta_mb']:>14}")
+
+
+if __name__ == '__main__':
+	main()
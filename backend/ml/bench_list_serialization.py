@@ -0,0 +1,100 @@
+"""Benchmark prediction list rendering: DRF serializer vs the fast path.
+
+Fills a throwaway SQLite database (migrated like the real one) with --rows
+predictions of one user with a profile, then times fetching and rendering
+them to JSON bytes, as one list response would:
+
+- serializer: select_related queryset, CropQualityPredictionSerializer and
+  DRF's JSONRenderer (what the listings do by default)
+- fast+json:  .values() rows, precomputed URL base, stdlib json
+- fast+orjson: the same rows rendered with orjson (CROP_FAST_LIST_RESPONSES)
+
+	python ml/bench_list_serialization.py --rows 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
+
+
+def best_of(fn, repeat):
+	times = []
+	for _ in range(repeat):
+		started = time.perf_counter()
+		fn()
+		times.append(time.perf_counter() - started)
+	return min(times)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--rows', type=int, default=5000)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		os.environ['DJANGO_SQLITE_PATH'] = os.path.join(directory, 'bench.sqlite3')
+		os.environ['CROP_MODEL_PRELOAD'] = 'False'
+		import django
+		django.setup()
+		from django.contrib.auth.models import User
+		from django.core.management import call_command
+		from rest_framework.renderers import JSONRenderer
+		from rest_framework.request import Request
+		from rest_framework.test import APIRequestFactory
+		from api import fast_lists
+		from api.models import CropQualityPrediction, UserProfile
+		from api.serializers import CropQualityPredictionSerializer
+
+		call_command('migrate', verbosity=0)
+		user = User.objects.create(username='bench', email='bench@example.com', first_name='Asha', last_name='Patil')
+		UserProfile.objects.create(user=user, user_type='farmer', address='Plot 7, Nashik')
+		CropQualityPrediction.objects.bulk_create([
+			CropQualityPrediction(
+				user=user, image=f'crop_images/{i % 256:02x}/{i % 97:02x}/{i:064x}.jpg',
+				thumbnail=f'crop_images/{i % 256:02x}/{i % 97:02x}/{i:064x}_thumb.webp',
+				medium=f'crop_images/{i % 256:02x}/{i % 97:02x}/{i:064x}_medium.webp',
+				predicted_quality='good' if i % 3 else 'bad', quality_score=(i % 100) / 100,
+				prediction_confidence=0.5 + (i % 50) / 100,
+			)
+			for i in range(args.rows)
+		], batch_size=1000)
+
+		request = Request(APIRequestFactory(SERVER_NAME='localhost').get('/api/my-predictions/'))
+		queryset = CropQualityPrediction.objects.filter(user=user).order_by('-created_at', '-id')
+
+		def serializer():
+			rows = CropQualityPredictionSerializer.setup_eager_loading(queryset)
+			return JSONRenderer().render(CropQualityPredictionSerializer(rows, many=True, context={'request': request}).data)
+
+		def fast_json():
+			data = fast_lists.prediction_rows(queryset.values(*fast_lists.PREDICTION_COLUMNS), request)
+			return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+		def fast_orjson():
+			return fast_lists.json_response(
+				fast_lists.prediction_rows(queryset.values(*fast_lists.PREDICTION_COLUMNS), request)
+			).content
+
+		assert json.loads(serializer()) == json.loads(fast_json()) == json.loads(fast_orjson())
+		modes = [('serializer', serializer), ('fast+json', fast_json)]
+		if fast_lists.orjson is not None:
+			modes.append(('fast+orjson', fast_orjson))
+		baseline = None
+		print(f"{args.rows} predictions per response")
+		print(f"{'mode':<14}{'ms':>10}{'rows/s':>12}{'speedup':>10}")
+		for name, fn in modes:
+			seconds = best_of(fn, args.repeat)
+			baseline = baseline or seconds
+			print(f"{name:<14}{seconds * 1000:>10.1f}{args.rows / seconds:>12.0f}{baseline / seconds:>9.1f}x")
+
+
+if __name__ == '__main__':
+	main()
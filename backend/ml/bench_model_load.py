@@ -0,0 +1,132 @@
+"""Benchmark crop-model load time and memory: pickle vs the memory-mapped export.
+
+A synthetic CNN-sized model (dense layers over pooled 200x200x3 input) is
+written both as a pickle and as a `.mmap` directory. Each mode then loads it
+in a fresh subprocess and scores one batch. Private memory (RssAnon) is what
+every worker pays separately; file-backed pages (RssFile) are shared by all
+workers mapping the same files.
+
+	python ml/bench_model_load.py --mb 256 --workers 4
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+
+MODES = ['pickle', 'mmap']
+
+
+class SyntheticCNN:
+	"""Stand-in for the trained model: mean-pool to 50x50x3, then dense layers."""
+
+	def __init__(self, total_mb, seed=0):
+		import numpy as np
+		rng = np.random.default_rng(seed)
+		inputs = 50 * 50 * 3
+		hidden = max(64, int(total_mb * 1e6 / 4 / (inputs + 1024)))
+		self.layers = [
+			(rng.standard_normal((inputs, hidden), dtype=np.float32) / 100, np.zeros(hidden, np.float32)),
+			(rng.standard_normal((hidden, 1024), dtype=np.float32) / 100, np.zeros(1024, np.float32)),
+			(rng.standard_normal((1024, 1), dtype=np.float32) / 100, np.zeros(1, np.float32)),
+		]
+
+	def predict(self, batch):
+		import numpy as np
+		x = batch.reshape(len(batch), 50, 4, 50, 4, 3).mean(axis=(2, 4)).reshape(len(batch), -1)
+		for weights, bias in self.layers[:-1]:
+			x = np.maximum(x @ weights + bias, 0)
+		weights, bias = self.layers[-1]
+		return 1 / (1 + np.exp(-(x @ weights + bias)))
+
+
+def memory_mb():
+	"""RssAnon / RssFile / VmRSS of this process in MB (Linux)"""
+	values = {}
+	with open('/proc/self/status') as f:
+		for line in f:
+			key, _, rest = line.partition(':')
+			if key in ('VmRSS', 'RssAnon', 'RssFile'):
+				values[key] = int(rest.split()[0]) / 1024.0
+	return values
+
+
+def generate(directory, total_mb):
+	from api.model_format import export_mapped_model
+	model = SyntheticCNN(total_mb)
+	with open(os.path.join(directory, 'model.pkl'), 'wb') as f:
+		pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+	export_mapped_model(model, os.path.join(directory, 'model.mmap'))
+
+
+def run_mode(mode, directory):
+	import numpy as np
+	from api.model_format import load_mapped_model
+
+	before = memory_mb()
+	started = time.perf_counter()
+	if mode == 'pickle':
+		with open(os.path.join(directory, 'model.pkl'), 'rb') as f:
+			model = pickle.load(f)
+	else:
+		model = load_mapped_model(os.path.join(directory, 'model.mmap'))
+	load_ms = (time.perf_counter() - started) * 1000.0
+	loaded = memory_mb()
+
+	batch = np.random.default_rng(1).random((8, 200, 200, 3), dtype=np.float32)
+	started = time.perf_counter()
+	model.predict(batch)
+	predict_ms = (time.perf_counter() - started) * 1000.0
+	after = memory_mb()
+	return {
+		'mode': mode,
+		'load_ms': round(load_ms, 1),
+		'first_predict_ms': round(predict_ms, 1),
+		'private_mb_after_load': round(loaded['RssAnon'] - before['RssAnon'], 1),
+		'private_mb': round(after['RssAnon'] - before['RssAnon'], 1),
+		'shared_file_mb': round(after['RssFile'] - before['RssFile'], 1),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--mb', type=int, default=256, help='Approximate weight size of the synthetic model')
+	parser.add_argument('--workers', type=int, default=4, help='Workers to extrapolate total private memory for')
+	parser.add_argument('--mode', choices=MODES + ['generate'], help=argparse.SUPPRESS)
+	parser.add_argument('--dir', help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.mode == 'generate':
+		generate(args.dir, args.mb)
+		return
+	if args.mode:
+		print(json.dumps(run_mode(args.mode, args.dir)))
+		return
+
+	with tempfile.TemporaryDirectory() as directory:
+		subprocess.run([sys.executable, __file__, '--mode', 'generate', '--dir', directory, '--mb', str(args.mb)],
+			check=True, cwd=ROOT)
+		size_mb = os.path.getsize(os.path.join(directory, 'model.pkl')) / 1e6
+		print(f"Synthetic model, {size_mb:.0f} MB of weights; totals for {args.workers} workers")
+		print(f"{'mode':<8}{'load ms':>10}{'predict ms':>12}{'private MB':>12}{'shared MB':>11}{'total private':>15}")
+		for mode in MODES:
+			# Mapped pages stay cached after the first run; that is the steady
+			# state for workers on one machine, so don't drop caches between modes
+			out = subprocess.run(
+				[sys.executable, __file__, '--mode', mode, '--dir', directory],
+				capture_output=True, text=True, check=True, cwd=ROOT,
+			)
+			r = json.loads(out.stdout.strip().splitlines()[-1])
+			print(f"{r['mode']:<8}{r['load_ms']:>10}{r['first_predict_ms']:>12}{r['private_mb']:>12}"
+				f"{r['shared_file_mb']:>11}{r['private_mb'] * args.workers:>15.1f}")
+
+
+if __name__ == '__main__':
+	main()
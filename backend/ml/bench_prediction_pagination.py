@@ -0,0 +1,115 @@
+"""Benchmark prediction listing pages: keyset cursor vs OFFSET, at any depth.
+
+Builds a throwaway SQLite database (migrated like the real one) holding
+--rows predictions for one user plus other users' rows, then times fetching
+one page at increasing depths with KeysetPagination and with LIMIT/OFFSET
+(what PageNumberPagination does), and prints SQLite's plan for the keyset
+query.
+
+	python ml/bench_prediction_pagination.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
+
+
+def best_of(fn, repeat):
+	times = []
+	for _ in range(repeat):
+		started = time.perf_counter()
+		fn()
+		times.append((time.perf_counter() - started) * 1000.0)
+	return min(times)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--rows', type=int, default=100000, help='Predictions of the benchmarked user')
+	parser.add_argument('--page-size', type=int, default=20)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		from django.conf import settings
+		# Never touch the project database
+		settings.DATABASES['default']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+		import django
+		django.setup()
+		from datetime import timedelta
+		from django.contrib.auth.models import User
+		from django.core.management import call_command
+		from django.db import connection
+		from django.utils import timezone
+		from rest_framework.request import Request
+		from rest_framework.test import APIRequestFactory
+		from api.models import CropQualityPrediction
+		from api.pagination import KeysetPagination
+
+		call_command('migrate', verbosity=0)
+		user = User.objects.create(username='heavy')
+		others = [User.objects.create(username=f'user{i}') for i in range(4)]
+		now = timezone.now()
+		started = time.perf_counter()
+		for offset in range(0, args.rows, 10000):
+			CropQualityPrediction.objects.bulk_create([
+				CropQualityPrediction(
+					user=owner, image='crop_images/x.jpg', predicted_quality='good', quality_score=0.5,
+					prediction_confidence=0.5, created_at=now - timedelta(seconds=i),
+				)
+				for i in range(offset, min(offset + 10000, args.rows))
+				for owner in ([user] + ([others[i % 4]] if i % 4 == 0 else []))
+			], batch_size=2000)
+		# auto_now_add overrides the timestamps on insert; spread them out afterwards
+		with connection.cursor() as cursor:
+			cursor.execute(
+				"UPDATE api_cropqualityprediction SET created_at = datetime('now', '-' || id || ' seconds')"
+			)
+		print(f"Inserted {CropQualityPrediction.objects.count()} rows in {time.perf_counter() - started:.1f}s "
+			f"({args.rows} for the benchmarked user)")
+
+		queryset = CropQualityPrediction.objects.filter(user=user)
+		ordered = queryset.order_by('-created_at', '-id')
+		factory = APIRequestFactory(SERVER_NAME='localhost')
+
+		def keyset_page(cursor_url):
+			paginator = KeysetPagination()
+			request = Request(factory.get(cursor_url))
+			return paginator.paginate_queryset(queryset, request)
+
+		def offset_page(depth):
+			return list(ordered[depth:depth + args.page_size])
+
+		print(f"{'depth':>8}{'keyset ms':>12}{'offset ms':>12}")
+		for depth in [0, 1000, 10000, 50000, args.rows - args.page_size]:
+			if depth >= args.rows:
+				continue
+			url = f'/api/my-predictions/?page_size={args.page_size}'
+			if depth:
+				before = ordered[depth - 1]
+				paginator = KeysetPagination()
+				paginator.base_url = 'http://localhost' + url
+				url = paginator.encode_cursor(before, reverse=False)
+			assert [p.id for p in keyset_page(url)] == [p.id for p in offset_page(depth)]
+			print(f"{depth:>8}{best_of(lambda: keyset_page(url), args.repeat):>12.2f}"
+				f"{best_of(lambda: offset_page(depth), args.repeat):>12.2f}")
+
+		middle = ordered[args.rows // 2]
+		seek = queryset.filter(created_at__lte=middle.created_at).exclude(
+			created_at=middle.created_at, id__gte=middle.id).order_by('-created_at', '-id')[:args.page_size + 1]
+		sql, params = seek.query.sql_with_params()
+		with connection.cursor() as cursor:
+			cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+			print('Keyset query plan:')
+			for row in cursor.fetchall():
+				print(f"  {row[-1]}")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,75 @@
+"""Benchmark tiled crop inference: one batched predict vs one call per tile.
+
+A synthetic CNN-sized model scores the overlapping 200x200 tiles of a large
+field photo three ways: tiles cut by copying each slice and scored one call
+at a time, the same with the vectorised tile_batch, and tile_batch with a
+single batched predict (what CropQualityPredictor.predict_tiled does).
+
+	python ml/bench_tiled_inference.py --edge 1200 --overlap 0.25
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+	sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
+
+from bench_model_load import SyntheticCNN  # noqa: E402
+
+
+def per_tile_slices(pixels, ys, xs):
+	import numpy as np
+	return [(pixels[y:y + 200, x:x + 200] / 255.0).astype(np.float32)[None] for y in ys for x in xs]
+
+
+def best_of(fn, repeat):
+	times = []
+	for _ in range(repeat):
+		started = time.perf_counter()
+		fn()
+		times.append((time.perf_counter() - started) * 1000.0)
+	return min(times)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--edge', type=int, default=1200, help='Longest edge of the working image (CROP_TILE_MAX_EDGE)')
+	parser.add_argument('--overlap', type=float, default=0.25, help='Tile overlap (CROP_TILE_OVERLAP)')
+	parser.add_argument('--mb', type=int, default=64, help='Approximate weight size of the synthetic model')
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+
+	import django
+	django.setup()
+	import numpy as np
+	from api.ml_utils import tile_batch, tile_positions
+
+	model = SyntheticCNN(args.mb)
+	pixels = np.random.default_rng(0).integers(0, 256, (args.edge * 3 // 4, args.edge, 3), dtype=np.uint8)
+	stride = max(1, int(round(200 * (1.0 - args.overlap))))
+	ys = tile_positions(pixels.shape[0], 200, stride)
+	xs = tile_positions(pixels.shape[1], 200, stride)
+	count = len(ys) * len(xs)
+	out = np.empty((count, 200, 200, 3), dtype=np.float32)
+	model.predict(out[:1])
+
+	cut_loop = best_of(lambda: per_tile_slices(pixels, ys, xs), args.repeat)
+	cut_vectorised = best_of(lambda: tile_batch(pixels, 200, stride, out=out), args.repeat)
+	tiles = per_tile_slices(pixels, ys, xs)
+	predict_each = best_of(lambda: [model.predict(t) for t in tiles], args.repeat)
+	predict_batched = best_of(lambda: model.predict(tile_batch(pixels, 200, stride, out=out)[0]), args.repeat)
+
+	print(f"{pixels.shape[1]}x{pixels.shape[0]} image, {count} tiles (stride {stride}), {args.mb} MB model")
+	print(f"{'':<28}{'ms':>10}")
+	print(f"{'cut tiles, per-tile copies':<28}{cut_loop:>10.1f}")
+	print(f"{'cut tiles, tile_batch':<28}{cut_vectorised:>10.1f}")
+	print(f"{'cut + predict per tile':<28}{cut_loop + predict_each:>10.1f}")
+	print(f"{'tile_batch + one predict':<28}{predict_batched:>10.1f}")
+	print(f"speed-up: {(cut_loop + predict_each) / predict_batched:.1f}x")
+
+
+if __name__ == '__main__':
+	main()
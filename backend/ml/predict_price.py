@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import asyncio
 from dataclasses import dataclass
 from typing import Dict, Any, Optional, Tuple
 
@@ -15,12 +16,21 @@ except Exception:
 	requests = None  # type: ignore
 	_HAS_REQUESTS = False
 
+# Async views use httpx for non-blocking requests when it is installed; the
+# async helpers fall back to running http_get in a worker thread otherwise.
+try:
+	import httpx  # type: ignore
+	_HAS_HTTPX = True
+except Exception:
+	httpx = None  # type: ignore
+	_HAS_HTTPX = False
+
 import urllib.request
 import urllib.parse
 
 
 class _SimpleResponse:
-	def _init_(self, status: int, content: bytes):
+	def __init__(self, status: int, content: bytes):
 		self.status_code = status
 		self._content = content
 
@@ -52,6 +62,28 @@ def http_get(url: str, params: Optional[Dict[str, Any]] = None, headers: Optiona
 	with urllib.request.urlopen(req, timeout=timeout) as resp:
 		body = resp.read()
 		return _SimpleResponse(resp.getcode(), body)
+
+
+def new_async_client(max_connections: int = 100) -> Any:
+	"""Create a pooled httpx.AsyncClient, or return None if httpx is not installed.
+
+	A client is bound to the event loop it is first used on.
+	"""
+	if not (_HAS_HTTPX and httpx is not None):
+		return None
+	limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections // 5 or 1)
+	return httpx.AsyncClient(limits=limits, follow_redirects=True)
+
+
+async def async_http_get(url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None, timeout: int = 15, client: Any = None):
+	"""Non-blocking counterpart of http_get.
+
+	Uses the given httpx.AsyncClient if one is passed, otherwise runs the
+	blocking http_get in a worker thread so the event loop stays free.
+	"""
+	if client is not None:
+		return await client.get(url, params=params, headers=headers or {}, timeout=timeout)
+	return await asyncio.to_thread(http_get, url, params, headers, timeout)
 import pandas as pd
 
 """
@@ -68,7 +100,7 @@ geocoding APIs (Open-Meteo and Nominatim).
 ESTIMATOR_NAME: str = "local-csv-estimator"
 
 # XGBoost model path (optional)
-MODEL_DIR = os.path.join(os.path.dirname(_file_), 'model')
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'model')
 XGB_MODEL_PATH = os.path.normpath(os.path.join(MODEL_DIR, 'price_xgb.json'))
 ENCODERS_PATH = os.path.normpath(os.path.join(MODEL_DIR, 'encoders.json'))
 
@@ -105,11 +137,11 @@ class WeatherSnapshot:
 	description: str
 
 
-def try_open_meteo_geocode(location: str) -> Optional[Tuple[float, float, str, Optional[str]]]:
-	params = {"name": location, "count": 1, "language": "en", "format": "json"}
-	resp = http_get(OPEN_METEO_GEOCODE_URL, params=params, timeout=15)
-	resp.raise_for_status()
-	data = resp.json()
+def _open_meteo_geocode_params(location: str) -> Dict[str, Any]:
+	return {"name": location, "count": 1, "language": "en", "format": "json"}
+
+
+def _parse_open_meteo_geocode(data: Dict[str, Any], location: str) -> Optional[Tuple[float, float, str, Optional[str]]]:
 	results = data.get("results") or []
 	if not results:
 		return None
@@ -122,12 +154,15 @@ def try_open_meteo_geocode(location: str) -> Optional[Tuple[float, float, str, O
 	)
 
 
-def try_nominatim_geocode(location: str) -> Optional[Tuple[float, float, str, Optional[str], Optional[str]]]:
-	params = {"q": location, "format": "json", "limit": 1, "addressdetails": 1}
-	headers = {"User-Agent": "price-predictor/1.0 (contact: local)"}
-	resp = http_get(NOMINATIM_URL, params=params, headers=headers, timeout=15)
-	resp.raise_for_status()
-	arr = resp.json() or []
+def _nominatim_params(location: str) -> Dict[str, Any]:
+	return {"q": location, "format": "json", "limit": 1, "addressdetails": 1}
+
+
+_NOMINATIM_HEADERS = {"User-Agent": "price-predictor/1.0 (contact: local)"}
+
+
+def _parse_nominatim(arr: Any, location: str) -> Optional[Tuple[float, float, str, Optional[str], Optional[str]]]:
+	arr = arr or []
 	if not arr:
 		return None
 	item = arr[0]
@@ -140,22 +175,37 @@ def try_nominatim_geocode(location: str) -> Optional[Tuple[float, float, str, Op
 	return (lat, lon, display, country, state)
 
 
-def geocode_location_and_state(location: str) -> Tuple[float, float, str, Optional[str], Optional[str]]:
-	found = try_open_meteo_geocode(location)
+def _resolve_geocode(location: str, found: Optional[Tuple[float, float, str, Optional[str]]], nom: Optional[Tuple[float, float, str, Optional[str], Optional[str]]]) -> Optional[Tuple[float, float, str, Optional[str], Optional[str]]]:
+	"""Combine an Open-Meteo match (coordinates) with a Nominatim match (state)."""
 	if found:
 		lat, lon, label, country = found
-		nom = try_nominatim_geocode(location)
 		state = nom[4] if nom else None
 		return lat, lon, label, country, state
+	return None
+
+
+def try_open_meteo_geocode(location: str) -> Optional[Tuple[float, float, str, Optional[str]]]:
+	resp = http_get(OPEN_METEO_GEOCODE_URL, params=_open_meteo_geocode_params(location), timeout=15)
+	resp.raise_for_status()
+	return _parse_open_meteo_geocode(resp.json(), location)
+
+
+def try_nominatim_geocode(location: str) -> Optional[Tuple[float, float, str, Optional[str], Optional[str]]]:
+	resp = http_get(NOMINATIM_URL, params=_nominatim_params(location), headers=_NOMINATIM_HEADERS, timeout=15)
+	resp.raise_for_status()
+	return _parse_nominatim(resp.json(), location)
+
+
+def geocode_location_and_state(location: str) -> Tuple[float, float, str, Optional[str], Optional[str]]:
+	found = try_open_meteo_geocode(location)
+	if found:
+		return _resolve_geocode(location, found, try_nominatim_geocode(location))
 	if "," in location:
 		simple = location.split(",", 1)[0].strip()
 		if simple:
 			found = try_open_meteo_geocode(simple)
 			if found:
-				lat, lon, label, country = found
-				nom = try_nominatim_geocode(location)
-				state = nom[4] if nom else None
-				return lat, lon, label, country, state
+				return _resolve_geocode(location, found, try_nominatim_geocode(location))
 	nom = try_nominatim_geocode(location)
 	if nom:
 		lat, lon, label, country, state = nom
@@ -163,8 +213,8 @@ def geocode_location_and_state(location: str) -> Tuple[float, float, str, Option
 	raise ValueError(f"Could not geocode location: {location}")
 
 
-def fetch_current_weather(lat: float, lon: float) -> Dict[str, Any]:
-	params = {
+def _weather_params(lat: float, lon: float) -> Dict[str, Any]:
+	return {
 		"latitude": lat,
 		"longitude": lon,
 		"current": [
@@ -175,7 +225,54 @@ def fetch_current_weather(lat: float, lon: float) -> Dict[str, Any]:
 		],
 		"timezone": "auto",
 	}
-	resp = http_get(OPEN_METEO_WEATHER_URL, params=params, timeout=15)
+
+
+def fetch_current_weather(lat: float, lon: float) -> Dict[str, Any]:
+	resp = http_get(OPEN_METEO_WEATHER_URL, params=_weather_params(lat, lon), timeout=15)
+	resp.raise_for_status()
+	return resp.json()
+
+
+# Async counterparts of the geocoding/weather helpers above. They issue the
+# same requests through async_http_get so an ASGI view can overlap them.
+
+async def async_try_open_meteo_geocode(location: str, client: Any = None) -> Optional[Tuple[float, float, str, Optional[str]]]:
+	resp = await async_http_get(OPEN_METEO_GEOCODE_URL, params=_open_meteo_geocode_params(location), timeout=15, client=client)
+	resp.raise_for_status()
+	return _parse_open_meteo_geocode(resp.json(), location)
+
+
+async def async_try_nominatim_geocode(location: str, client: Any = None) -> Optional[Tuple[float, float, str, Optional[str], Optional[str]]]:
+	resp = await async_http_get(NOMINATIM_URL, params=_nominatim_params(location), headers=_NOMINATIM_HEADERS, timeout=15, client=client)
+	resp.raise_for_status()
+	return _parse_nominatim(resp.json(), location)
+
+
+async def async_geocode_location_and_state(location: str, client: Any = None) -> Tuple[float, float, str, Optional[str], Optional[str]]:
+	"""Same resolution order as geocode_location_and_state, but Open-Meteo and
+	Nominatim are queried concurrently since every branch needs the Nominatim
+	answer for the full location anyway.
+	"""
+	found, nom = await asyncio.gather(
+		async_try_open_meteo_geocode(location, client=client),
+		async_try_nominatim_geocode(location, client=client),
+	)
+	if found:
+		return _resolve_geocode(location, found, nom)
+	if "," in location:
+		simple = location.split(",", 1)[0].strip()
+		if simple:
+			found = await async_try_open_meteo_geocode(simple, client=client)
+			if found:
+				return _resolve_geocode(location, found, nom)
+	if nom:
+		lat, lon, label, country, state = nom
+		return lat, lon, label, country, state
+	raise ValueError(f"Could not geocode location: {location}")
+
+
+async def async_fetch_current_weather(lat: float, lon: float, client: Any = None) -> Dict[str, Any]:
+	resp = await async_http_get(OPEN_METEO_WEATHER_URL, params=_weather_params(lat, lon), timeout=15, client=client)
 	resp.raise_for_status()
 	return resp.json()
 
@@ -279,7 +376,7 @@ def predict_with_model(crop_name: str, kilograms: float, trend: Dict[str, Any],
 		data = _np.array([[crop_enc, state_enc, median_all, median_12m, p25, p75, unit_scale]])
 		dmat = xgb.DMatrix(data)
 		pred = booster.predict(dmat)
-		price_per_kg = float(pred[0]) if getattr(pred, '_len_', lambda: 1)() > 0 else float(pred)
+		price_per_kg = float(pred[0]) if getattr(pred, '__len__', lambda: 1)() > 0 else float(pred)
 		price_per_kg = round(max(0.0, price_per_kg), 2)
 		total_price = round(price_per_kg * float(kilograms), 2)
 
@@ -319,9 +416,9 @@ def infer_unit_scale(df_crop: pd.DataFrame) -> float:
 
 
 def compute_trend_stats(df: pd.DataFrame, crop_name: str, state_name: Optional[str]) -> Dict[str, Any]:
-	df1 = df[df["commodity_name"].astype(str).str.contains(crop_name, case=False, na=False)]
+	df1 = df[df["commodity_name"].astype(str).str.contains(crop_name, case=False, na=False, regex=False)]
 	if state_name:
-		df1 = df1[df1["state"].astype(str).str.contains(state_name, case=False, na=False)]
+		df1 = df1[df1["state"].astype(str).str.contains(state_name, case=False, na=False, regex=False)]
 	if df1.empty:
 		return {"rows": 0}
 	df1 = df1.dropna(subset=["date"]).copy()
@@ -581,5 +678,5 @@ def main() -> None:
 	print_human_readable(estimate, trend, profit_margin, distributor_markup, retailer_markup)
 
 
-if _name_ == "_main_":
+if __name__ == "__main__":
 	main()
\ No newline at end of file
@@ -13,4 +13,28 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+from api.pricing import close_http_client, open_http_client  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Django, plus the lifespan protocol that owns the worker's pooled HTTP client"""
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await open_http_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_http_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+if settings.CROP_MODEL_PRELOAD:
+    # Load and warm the crop model before serving; with gunicorn's
+    # preload_app this happens once in the master, before workers fork.
+    from api.ml_utils import predictor  # noqa: E402
+    predictor.ensure_loaded()
@@ -0,0 +1,44 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise middleware that can also run natively under ASGI.
+
+    Stock WhiteNoiseMiddleware is sync-only, which makes Django run every
+    request below it (including async views) through a single adapter thread
+    when served by an ASGI worker. Static file lookup is a dict hit, so it is
+    safe to do inline on the event loop; file contents are streamed through an
+    async iterator so Django does not buffer them with a sync-iterator warning.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            response = self.serve(static_file, request)
+            if response.file_to_stream is not None:
+                response.streaming_content = _read_chunks(response.file_to_stream)
+            return response
+        return await self.get_response(request)
+
+
+async def _read_chunks(file, block_size=64 * 1024):
+    # The file stays registered with the response, which closes it when done
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while chunk := await read(block_size):
+        yield chunk
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sih_backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CROP_MODEL_PRELOAD:
+    # Load and warm the crop model before serving; with gunicorn's
+    # preload_app this happens once in the master, before workers fork.
+    from api.ml_utils import predictor  # noqa: E402
+    predictor.ensure_loaded()
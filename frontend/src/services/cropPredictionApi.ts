@@ -22,6 +22,12 @@ export interface CropPredictionResult {
   created_at: string;
 }
 
+export interface PredictionPage {
+  next: string | null;
+  previous: string | null;
+  results: CropPredictionResult[];
+}
+
 export interface PredictionError {
   error: string;
   detail?: string;
@@ -77,12 +83,13 @@ class CropPredictionApi {
   }
 
   /**
-   * Get all predictions for the current user
+   * Get one page of the current user's predictions, newest first.
+   * Pass the previous page's `next` (or `previous`) URL to move through them.
    */
-  async getUserPredictions(): Promise<CropPredictionResult[]> {
+  async getUserPredictions(pageUrl?: string): Promise<PredictionPage> {
     const headers = await this.getAuthHeaders();
 
-    const response = await fetch(`${API_BASE_URL}/my-predictions/`, {
+    const response = await fetch(pageUrl || `${API_BASE_URL}/my-predictions/`, {
       method: 'GET',
       headers,
     });